@@ -1,10 +1,13 @@
 import paramiko
 import psycopg2
 from knob_config.parse_knob_config import get_knobs
+from metrics_collector import MetricsCollector
+from instrumentation import span
 import os
 import json
 import subprocess
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 class Database:
     def __init__(self, config, path):
@@ -14,7 +17,13 @@ class Database:
         self.user = config['database_config']['user']
         self.password = config['database_config']['password']
         self.data_path = config['database_config']['data_path']
+        # pg_ctlcluster <pg_version> <cluster> of this server, main for the default Debian cluster
+        self.pg_version = config['database_config'].get('pg_version', '14')
+        self.cluster = config['database_config'].get('cluster', 'main')
+        self.template = config['database_config'].get('template_database', f"{self.database}_template")
         self.knobs = get_knobs(path)
+        # declarative stat view queries, see config/inner_metrics.json
+        self.metrics = MetricsCollector(config['database_config'].get('inner_metrics_config'))
 
     def get_conn(self, max_retries=3):
         print(f"Connecting to PostgreSQL at {self.host}:{self.port} with database {self.database}")
@@ -154,6 +163,7 @@ class Database:
         
         return plans
 
+    @span('db.reset_metrics')
     def reset_inner_metrics(self):
         """
         Reset internal metrics in PostgreSQL
@@ -172,99 +182,22 @@ class Database:
             conn.close()
             
     
+    @span('db.fetch_metrics')
     def fetch_inner_metrics(self):
         """
         Fetch internal metrics from PostgreSQL as a JSON dictionary
         """
-        metrics = {}
         conn = self.get_conn()
-        cursor = conn.cursor()
-
         try:
-            # Standard database metrics
-            database_stats_sql = """
-            SELECT 
-                COALESCE(SUM(xact_commit), 0),
-                COALESCE(SUM(xact_rollback), 0),
-                COALESCE(SUM(blks_read), 0),
-                COALESCE(SUM(blks_hit), 0),
-                COALESCE(SUM(tup_returned), 0),
-                COALESCE(SUM(tup_fetched), 0),
-                COALESCE(SUM(tup_inserted), 0),
-                COALESCE(SUM(conflicts), 0),
-                COALESCE(SUM(tup_updated), 0),
-                COALESCE(SUM(tup_deleted), 0)
-            FROM pg_stat_database 
-            WHERE datname = %s;
-            """
-        
-            cursor.execute(database_stats_sql, (self.database,))
-            result = cursor.fetchone()
-            
-            # Map results to meaningful names
-            metrics.update({
-                "xact_commit": float(result[0]),
-                "xact_rollback": float(result[1]),
-                "blks_read": float(result[2]),
-                "blks_hit": float(result[3]),
-                "tup_returned": float(result[4]),
-                "tup_fetched": float(result[5]),
-                "tup_inserted": float(result[6]),
-                "conflicts": float(result[7]),
-                "tup_updated": float(result[8]),
-                "tup_deleted": float(result[9])
-            })
-            
-            # Disk read count (accurate)
-            disk_read_sql = """
-            SELECT 
-                COALESCE(SUM(
-                    COALESCE(heap_blks_read, 0) +
-                    COALESCE(idx_blks_read, 0) +
-                    COALESCE(toast_blks_read, 0) +
-                    COALESCE(tidx_blks_read, 0)
-                ), 0) as disk_read_count
-            FROM pg_statio_all_tables;
-            """
-            
-            cursor.execute(disk_read_sql)
-            result = cursor.fetchone()
-            metrics["disk_read_count"] = float(result[0])
-            
-            # Disk write count (from background writer)
-            bgwriter_sql = """
-            SELECT 
-                buffers_checkpoint + buffers_clean + buffers_backend as disk_write_count
-            FROM pg_stat_bgwriter;
-            """
-            
-            cursor.execute(bgwriter_sql)
-            result = cursor.fetchone()
-            metrics["disk_write_count"] = float(result[0])
-            
-            # Calculate bytes from block counts
-            metrics["disk_read_bytes"] = metrics["disk_read_count"] * 8192  # 8KB per block
-            metrics["disk_write_bytes"] = metrics["disk_write_count"] * 8192  # 8KB per block
-            
+            metrics = self.metrics.collect(conn, {'database': self.database})
             print(f"Fetched {len(metrics)} internal metrics")
             print("Internal metrics:", metrics)
-            
-        except Exception as e:
-            print(f"Error fetching internal metrics: {e}")
-            # Return empty metrics with default values
-            metrics = {
-                "xact_commit": 0.0, "xact_rollback": 0.0, "blks_read": 0.0, "blks_hit": 0.0,
-                "tup_returned": 0.0, "tup_fetched": 0.0, "tup_inserted": 0.0, "conflicts": 0.0,
-                "tup_updated": 0.0, "tup_deleted": 0.0, "disk_read_count": 0.0, "disk_write_count": 0.0,
-                "disk_read_bytes": 0.0, "disk_write_bytes": 0.0
-            }
-        
         finally:
-            cursor.close()
             conn.close()
         
         return metrics
     
+    @span('db.change_knob')
     def change_knob(self, knobs):
         """
         Apply knob changes without SSH - PostgreSQL only
@@ -317,19 +250,20 @@ class Database:
         
         return flag
     
+    @span('db.restart')
     def restart_db(self):
         """
-        Simple restart of PostgreSQL 14 using pg_ctlcluster
+        Simple restart of the PostgreSQL cluster using pg_ctlcluster
         """
         try:
-            print("Stopping PostgreSQL 14...")
-            subprocess.run(['sudo', 'pg_ctlcluster', '14', 'main', 'stop'], 
+            print(f"Stopping PostgreSQL {self.pg_version}/{self.cluster}...")
+            subprocess.run(['sudo', 'pg_ctlcluster', self.pg_version, self.cluster, 'stop'], 
                         check=True, timeout=30)
             
             time.sleep(2)  # Wait a moment
             
-            print("Starting PostgreSQL 14...")
-            result = subprocess.run(['sudo', 'pg_ctlcluster', '14', 'main', 'start'], 
+            print(f"Starting PostgreSQL {self.pg_version}/{self.cluster}...")
+            result = subprocess.run(['sudo', 'pg_ctlcluster', self.pg_version, self.cluster, 'start'], 
                                 capture_output=True, text=True, timeout=30)
             
             if result.returncode != 0:
@@ -341,10 +275,10 @@ class Database:
                 time.sleep(1)
 
                 # Try starting again
-                subprocess.run(['sudo', 'pg_ctlcluster', '14', 'main', 'start'], 
+                subprocess.run(['sudo', 'pg_ctlcluster', self.pg_version, self.cluster, 'start'], 
                             check=True, timeout=30)
             
-            print("PostgreSQL 14 restarted successfully!")
+            print(f"PostgreSQL {self.pg_version}/{self.cluster} restarted successfully!")
             return True
             
         except Exception as e:
@@ -352,7 +286,7 @@ class Database:
             return False
         
     def remove_auto_conf(self):
-        auto_conf_path = "/var/lib/postgresql/14/main/postgresql.auto.conf"
+        auto_conf_path = os.path.join(self.data_path, "postgresql.auto.conf")
         try:
             # Use -f flag to force removal (no error if file doesn't exist)
             subprocess.run(['sudo', 'rm', '-f', auto_conf_path], check=True)
@@ -391,11 +325,107 @@ class Database:
         print(f"All PostgreSQL knobs saved to {filepath}")
         return knob_details
 
+    def fetch_hot_relations(self, limit=50):
+        """
+        Most accessed tables and indexes of the current database by buffer
+        accesses (hits + reads) in pg_statio_user_tables/indexes, hottest first
+        """
+        conn = self.get_conn()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT name, accesses FROM (
+                    SELECT quote_ident(schemaname) || '.' || quote_ident(relname) AS name,
+                           COALESCE(heap_blks_read, 0) + COALESCE(heap_blks_hit, 0) AS accesses
+                    FROM pg_statio_user_tables
+                    UNION ALL
+                    SELECT quote_ident(schemaname) || '.' || quote_ident(indexrelname),
+                           COALESCE(idx_blks_read, 0) + COALESCE(idx_blks_hit, 0)
+                    FROM pg_statio_user_indexes
+                ) rel
+                WHERE accesses > 0
+                ORDER BY accesses DESC
+                LIMIT %s;
+            """, (limit,))
+            relations = [row[0] for row in cursor.fetchall()]
+            print(f"Found {len(relations)} hot relations")
+            return relations
+        except Exception as e:
+            print(f"Error fetching hot relations: {e}")
+            return []
+        finally:
+            cursor.close()
+            conn.close()
+
+    @span('db.prewarm')
+    def prewarm_relations(self, relations, threads=4):
+        """
+        Load relations into shared_buffers with pg_prewarm, several relations
+        in parallel on separate connections. Returns (seconds, blocks loaded).
+        """
+        start = time.time()
+        conn = self.get_conn()
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm;")
+        except Exception as e:
+            print(f"pg_prewarm is not available: {e}")
+            return 0.0, 0
+        finally:
+            cursor.close()
+            conn.close()
+
+        def prewarm(relation):
+            conn = self.get_conn()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT pg_prewarm(%s::regclass);", (relation,))
+                return cursor.fetchone()[0]
+            except Exception as e:
+                print(f"Error prewarming {relation}: {e}")
+                return 0
+            finally:
+                cursor.close()
+                conn.close()
+
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as pool:
+            blocks = sum(pool.map(prewarm, relations))
+        elapsed = time.time() - start
+        print(f"Prewarmed {len(relations)} relations ({blocks} blocks) in {elapsed:.2f} seconds")
+        return elapsed, blocks
+
+    def fetch_baseline_signature(self, template):
+        """
+        PostgreSQL version and identity of the data the workload runs on: the
+        template database when it exists (oid and size, fixed until it is
+        reloaded), otherwise the oid of the tuned database itself
+        """
+        conn = self.get_conn()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT current_setting('server_version_num');")
+            signature = {'server_version': cursor.fetchone()[0]}
+            cursor.execute("SELECT oid, pg_database_size(oid) FROM pg_database WHERE datname = %s;", (template,))
+            row = cursor.fetchone()
+            if row is not None:
+                signature['template'] = {'name': template, 'oid': int(row[0]), 'size': int(row[1])}
+            else:
+                cursor.execute("SELECT oid FROM pg_database WHERE datname = current_database();")
+                signature['template'] = {'name': self.database, 'oid': int(cursor.fetchone()[0])}
+            return signature
+        finally:
+            cursor.close()
+            conn.close()
+
+    @span('db.recreate')
     def recreate_from_template(self):
         """Recreate database from template using the copy_db script"""
         try:
             print(f"Recreating database {self.database} from template...")
-            result = subprocess.run(['bash', 'scripts/copy_db_from_template.sh', self.database], text=True, timeout=240)
+            result = subprocess.run(['bash', 'scripts/copy_db_from_template.sh', self.database, self.host, str(self.port),
+                                     self.user, self.template], text=True, timeout=240,
+                                    env=dict(os.environ, PGPASSWORD=self.password))
             
             # Print the shell script output to capture it in nohup log
             if result.stdout:
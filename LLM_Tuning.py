@@ -7,6 +7,8 @@ from workload_executor import workload_executor
 import utils
 import json
 from data_processing.format_query_plans import format_query_plans
+from workload_parser import load_workload
+from baseline_cache import BaselineCache
 
 feature_names = ['size of workload', 'read ratio', 'group by ratio', 'order by ratio', 'aggregation ratio', 'average predicate num per SQL']
 inner_names = ["xact_commit", "xact_rollback", "blks_read", "blks_hit", "tup_returned", "tup_fetched", "tup_inserted", "conflicts", "tup_updated", "tup_deleted", "disk_read_count", "disk_write_count", "disk_read_bytes", "disk_write_bytes"]
@@ -21,10 +23,8 @@ class LLMTuning:
         self.workload_name = workload_name
         self.query_plan_location = "query_plans/tpch.json"
 
-        # Read workload file content - add '.olap_workloads/' 
-        workload_file = os.path.join('./olap_workloads', workload_file)
-        with open(workload_file, 'r') as f:
-            self.workload_content = f.read()
+        # Workload file lives under '.olap_workloads/', statements are parsed once and cached
+        self.workload_path = os.path.join('./olap_workloads', workload_file)
 
     def default_run(self, workload_file, args):
         """Run the default configuration"""
@@ -34,6 +34,13 @@ class LLMTuning:
         # remove auto_conf from the database
         self.db.remove_auto_conf() 
 
+        # reuse the baseline of an earlier session if workload, database and data are unchanged
+        baseline_cache = BaselineCache(self.db, args)
+        baseline = baseline_cache.load(workload_file)
+        if baseline is not None:
+            # same shape and objective value as a fresh run below
+            return {"internal_metrics": baseline['internal_metrics'], "qps": baseline['value']}
+
         # reset inner metrics
         print("Resetting inner metrics...")
         self.db.reset_inner_metrics()
@@ -45,9 +52,12 @@ class LLMTuning:
         # get the internal metrics
         internal_metrics = self.db.fetch_inner_metrics()
         print(f"Internal metrics collected: {internal_metrics}")
-        # save the internal metrics to a file
-        with open(f"internal_metrics/{workload_file.split('.wg')[0]}_internal_metrics.json", "w") as f:
+        # save the internal metrics to a file, where BaselineCache looks for them (per benchmark for OLTP)
+        metrics_file = baseline_cache.metrics_file(workload_file)
+        os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+        with open(metrics_file, "w") as f:
             json.dump(internal_metrics, f, indent=4)
+        baseline_cache.save(workload_file, self.executor.qps, qps)
         
         return {"internal_metrics": internal_metrics, "qps": qps}
 
@@ -72,16 +82,8 @@ class LLMTuning:
 
         print("Parsing workload content into individual SQL queries...")
     
-        # Parse workload content into individual SQL queries
-        sql_queries = []
-        for line in self.workload_content.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('--') and not line.startswith('#'):  # Skip comments and empty lines
-                # Handle multi-line SQL statements
-                if line.endswith(';'):
-                    sql_queries.append(line[:-1])  # Remove semicolon for EXPLAIN
-                elif line:  # Non-empty line without semicolon
-                    sql_queries.append(line)
+        # Statements come without the trailing semicolon, as EXPLAIN expects
+        sql_queries = list(load_workload(self.workload_path))
 
         plans = self.db.save_workload_plans(sql_queries, self.workload_name)
         print(f"Query plans collected for {len(plans)} queries")   
@@ -93,10 +95,8 @@ class LLMTuning:
 
     def get_workload_statistics(self):
         # Clean and normalize the text
-        workload_text = self.workload_content.upper()
-
-        # Split into SQL statements (by semicolon)
-        sql_statements = [stmt.strip() for stmt in workload_text.split(';') if stmt.strip()]
+        sql_statements = [stmt.upper() for stmt in load_workload(self.workload_path)]
+        workload_text = ';\n'.join(sql_statements)
         total_statements = len(sql_statements)
 
         # 1. Size of workload
@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+from event_recorder import EventRecorder, write_run_report
+from instrumentation import span
+from latency_histogram import TemplateLatency
+from multi_thread import key, max_sql_num, penalized_performance, unfinished_penalty
+from sql_template import PreparedStatements, fingerprint, template_id
+from workload_parser import load_workload
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+class async_multi_session:
+    """
+    asyncio alternative to multi_thread for the DWG path.
+    All sessions pull from one shared queue, so a session that finishes its
+    queries early keeps taking the remaining ones instead of idling.
+    """
+    def __init__(self, db, workload_path, session_num, log_path, prepared=False,
+                 statement_timeout=0, run_budget=0, timeout_penalty=2.0):
+        if asyncpg is None:
+            raise ImportError("asyncpg is required for the async OLAP driver: pip install asyncpg")
+        self.workload_name = workload_path
+        self.session_num = session_num
+        self.db = db
+        self.wg_path = workload_path
+        self.log_path = log_path
+        self.sql_list = []
+        self.latency = None
+        self.prepared = prepared
+        # same budget semantics as multi_thread
+        self.statement_timeout = int(statement_timeout)
+        self.run_budget = float(run_budget)
+        self.timeout_penalty = float(timeout_penalty)
+        limit = self.statement_timeout / 1000.0 if self.statement_timeout > 0 else self.run_budget
+        self.penalty_latency = float(timeout_penalty) * limit
+        self.deadline = None
+        self.budget_exhausted = False
+
+    @span('dwg.load')
+    def data_pre(self):
+        self.sql_list = list(load_workload(self.wg_path)[:max_sql_num])
+
+    async def connect(self):
+        server_settings = {}
+        if self.statement_timeout > 0:
+            server_settings['statement_timeout'] = str(self.statement_timeout)
+        return await asyncpg.connect(database=self.db.database,
+                                     user=self.db.user,
+                                     password=self.db.password,
+                                     host=self.db.host,
+                                     port=int(self.db.port),
+                                     server_settings=server_settings)
+
+    def remaining_budget(self):
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def skip_remaining(self, queue, recorder, latency, index, sql):
+        # the budget is shared, so drain everything that is still queued
+        self.budget_exhausted = True
+        pending = [(index, sql)]
+        while True:
+            try:
+                pending.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        for i, it in pending:
+            recorder.skip(i, 1)
+            template = fingerprint(it)
+            latency.record(template_id(template), template, self.penalty_latency)
+
+    async def one_session(self, session_id, queue, connection, time_stamp, latency):
+        recorder = EventRecorder(session_id)
+        prepared = PreparedStatements() if self.prepared else None
+        start_time = time.time()
+        while True:
+            try:
+                index, sql = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            remaining = self.remaining_budget()
+            if remaining is not None and remaining <= 0:
+                self.skip_remaining(queue, recorder, latency, index, sql)
+                break
+            query_start = time.perf_counter()
+            try:
+                # asyncpg runs outside an explicit transaction, so each statement autocommits
+                if prepared is None:
+                    await connection.execute(sql, timeout=remaining)
+                else:
+                    await self.execute_prepared(connection, prepared, sql, remaining)
+            except asyncio.TimeoutError:
+                self.skip_remaining(queue, recorder, latency, index, sql)
+                break
+            except asyncpg.exceptions.QueryCanceledError:
+                # statement_timeout hit, count it with the penalty latency instead of waiting
+                recorder.timeout(index, time.perf_counter() - query_start)
+                template = fingerprint(sql)
+                latency.record(template_id(template), template, self.penalty_latency)
+                continue
+            except Exception as e:
+                # counted as unfinished, the session goes on with the next statement
+                recorder.error(index, sql, e)
+                continue
+            elapsed = time.perf_counter() - query_start
+            template = fingerprint(sql)
+            latency.record(template_id(template), template, elapsed)
+            recorder.sql(index, elapsed)
+        recorder.finish()
+        time_stamp[session_id] = key(recorder.processed, time.time() - start_time)
+        return recorder
+
+    async def execute_prepared(self, connection, prepared, sql, timeout=None):
+        prepare_sql, execute_sql, template = prepared.plan(sql)
+        if prepare_sql is not None:
+            try:
+                await connection.execute(prepare_sql, timeout=timeout)
+                prepared.prepared(template, prepare_sql)
+            except asyncio.TimeoutError:
+                raise
+            except Exception:
+                prepared.fail(template)
+                execute_sql = sql
+        try:
+            await connection.execute(execute_sql, timeout=timeout)
+        except (asyncio.TimeoutError, asyncpg.exceptions.QueryCanceledError):
+            raise
+        except Exception:
+            if execute_sql == sql:
+                raise
+            prepared.fail(template)
+            await connection.execute(sql, timeout=timeout)
+
+    async def run_sessions(self):
+        queue = asyncio.Queue()
+        for index, sql in enumerate(self.sql_list):
+            queue.put_nowait((index, sql))
+
+        connections = await asyncio.gather(*[self.connect() for _ in range(self.session_num)])
+        time_stamp = dict()
+        self.latency = TemplateLatency()
+        self.budget_exhausted = False
+        try:
+            start_time = time.time()
+            self.deadline = start_time + self.run_budget if self.run_budget > 0 else None
+            recorders = await asyncio.gather(*[
+                self.one_session(i, queue, connections[i], time_stamp, self.latency)
+                for i in range(self.session_num)
+            ])
+            end_time = time.time()
+        finally:
+            await asyncio.gather(*[c.close() for c in connections], return_exceptions=True)
+        return start_time, end_time, time_stamp, recorders
+
+    @span('dwg.run')
+    def run(self):
+        start_time, end_time, time_stamp, recorders = asyncio.run(self.run_sessions())
+        total_time = end_time - start_time
+        total_sql = sum(time_stamp[i].value for i in range(self.session_num))
+        unfinished = sum(r.unfinished() for r in recorders)
+
+        write_run_report(self.log_path, {
+            "workload": self.wg_path,
+            "driver": "async",
+            "prepared": self.prepared,
+            "workers": self.session_num,
+            "total_sql": total_sql,
+            "failed_sql": sum(r.failed for r in recorders),
+            "timed_out_sql": sum(r.timed_out for r in recorders),
+            "skipped_sql": sum(r.skipped for r in recorders),
+            "budget_exhausted": self.budget_exhausted,
+            "statement_timeout": self.statement_timeout,
+            "run_budget": self.run_budget,
+            "total_time": total_time,
+            "latency": self.latency.to_dict(),
+        }, recorders)
+        print('length of sql list: ', total_sql)
+        print('total time: ', total_time)
+        print('latency: ', self.latency.overall.to_dict())
+        penalty = unfinished_penalty(self.statement_timeout, self.run_budget, self.timeout_penalty,
+                                     total_sql, total_time, self.session_num)
+        return penalized_performance(total_sql, unfinished, total_time, self.session_num, *penalty)
@@ -0,0 +1,98 @@
+import json
+import os
+from workload_parser import file_digest
+from mock_backend import output_path
+from result_cache import run_settings
+
+oltp_benchmarks = ['tpcc', 'ycsb', 'smallbank', 'wikipedia', 'twitter']
+
+
+def metrics_path(workload_file, benchmark_name):
+    """File holding the default run's internal metrics of a workload"""
+    if benchmark_name in oltp_benchmarks:
+        # OLTP: benchmark subdirectory and the XML file name, e.g. internal_metrics/tpcc/sample_tpcc_config0_internal_metrics.json
+        workload_name = os.path.splitext(os.path.basename(workload_file))[0]
+        return f"internal_metrics/{benchmark_name}/{workload_name}_internal_metrics.json"
+    return f"internal_metrics/{workload_file.split('.wg')[0]}_internal_metrics.json"
+
+
+class BaselineCache:
+    """
+    Default-configuration results (QPS and internal metrics) reused across sessions.
+    The metrics stay in the internal_metrics/ files written by the default runs; a
+    sidecar .baseline.json next to each holds the QPS and the signature they were
+    measured under: workload content, database, the run settings of the result cache key,
+    PostgreSQL version and the data template (oid and size of <database>_template,
+    which only change when it is reloaded).
+    """
+    def __init__(self, db, args):
+        self.db = db
+        self.args = args
+        self.benchmark_name = args['benchmark_config'].get('benchmark', 'tpch')
+        self.enabled = args['benchmark_config'].get('baseline_cache', 'true').lower() == 'true'
+        # re-measure the default configuration even when a matching baseline exists
+        self.refresh = args['benchmark_config'].get('baseline_refresh', 'false').lower() == 'true'
+        self.template = args['database_config'].get('template_database', f"{db.database}_template")
+        # the default run's objective value depends on it, a qps baseline is no use to a latency session
+        self.objective = args['benchmark_config'].get('objective', 'qps').lower()
+
+    def metrics_file(self, workload_file):
+        """metrics_path of the workload, under mock_output_root with backend = mock"""
+        return output_path(self.args, metrics_path(workload_file, self.benchmark_name))
+
+    def sidecar_path(self, workload_file):
+        return self.metrics_file(workload_file).replace('.json', '.baseline.json')
+
+    def signature(self, workload_file):
+        workload = file_digest(workload_file) if os.path.isfile(workload_file) else os.path.basename(workload_file)
+        signature = {'workload': workload, 'database': f"{self.db.host}:{self.db.port}/{self.db.database}"}
+        # run length, concurrency and driver change what the default run measures, as for the result cache
+        benchmark_config = self.args['benchmark_config']
+        signature['settings'] = {name: benchmark_config.get(name) for name in run_settings}
+        signature.update(self.db.fetch_baseline_signature(self.template))
+        return signature
+
+    def load(self, workload_file):
+        """
+        Cached {'qps', 'value', 'internal_metrics'} if still valid for this workload,
+        database and objective, else None. value is what run_config returned.
+        """
+        if not self.enabled or self.refresh:
+            return None
+        sidecar = self.sidecar_path(workload_file)
+        metrics_file = self.metrics_file(workload_file)
+        if not (os.path.exists(sidecar) and os.path.exists(metrics_file)):
+            return None
+        with open(sidecar, 'r') as f:
+            baseline = json.load(f)
+        try:
+            signature = self.signature(workload_file)
+        except Exception as e:
+            print(f"Could not check baseline signature, re-measuring: {e}")
+            return None
+        if baseline.get('signature') != signature:
+            print(f"Baseline for {workload_file} is stale, re-measuring")
+            return None
+        if baseline.get('objective', 'qps') != self.objective:
+            print(f"Baseline for {workload_file} was measured for objective {baseline.get('objective', 'qps')}, re-measuring")
+            return None
+        with open(metrics_file, 'r') as f:
+            internal_metrics = json.load(f)
+        print(f"Reusing default run baseline from {sidecar}: QPS {baseline['qps']}")
+        return {'qps': baseline['qps'], 'value': baseline.get('value', baseline['qps']), 'internal_metrics': internal_metrics}
+
+    def save(self, workload_file, qps, value=None):
+        """
+        Record the default run's QPS and objective value (run_config's result,
+        the QPS when not given) next to its internal metrics file, failed runs are not recorded
+        """
+        if not self.enabled or not qps or not os.path.exists(self.metrics_file(workload_file)):
+            return
+        try:
+            signature = self.signature(workload_file)
+        except Exception as e:
+            print(f"Could not record baseline signature: {e}")
+            return
+        with open(self.sidecar_path(workload_file), 'w') as f:
+            json.dump({'qps': qps, 'objective': self.objective, 'value': qps if value is None else value,
+                       'signature': signature}, f, indent=4)
@@ -0,0 +1,71 @@
+import copy
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+# Per-database workload sizing applied on top of the workload XML
+database_overrides = {
+    # more challenging ycsb workload
+    'ycsb': {'scalefactor': '3600', 'rate': '70000'},
+    'wikipedia': {'scalefactor': '22', 'rate': 'unlimited'},
+    'twitter': {'scalefactor': '80', 'rate': 'unlimited'},
+    'smallbank': {'scalefactor': '45', 'rate': 'unlimited'},
+}
+
+_templates = {}
+_lock = threading.Lock()
+
+
+class BenchBaseConfigTemplate:
+    """
+    Parsed BenchBase workload XML.
+    The source file is parsed once and never written; every render works on a
+    copy of the cached tree, so concurrent sessions can share one workload file.
+    """
+    def __init__(self, path):
+        self.path = path
+        parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+        self.root = ET.parse(path, parser=parser).getroot()
+
+    def render(self, values):
+        """XML text with the text of every element named in values replaced"""
+        root = copy.deepcopy(self.root)
+        for tag, value in values.items():
+            for element in root.iter(tag):
+                element.text = str(value)
+        return '<?xml version="1.0"?>\n' + ET.tostring(root, encoding='unicode') + '\n'
+
+    def render_to_file(self, values, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render(values))
+        return path
+
+
+def get_template(path):
+    """Cached template for a workload XML, re-parsed only when the file changes"""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _templates.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    template = BenchBaseConfigTemplate(path)
+    with _lock:
+        _templates[path] = (mtime, template)
+    return template
+
+
+def run_values(database_config, benchmark_config, benchmark_name):
+    """Per-run values: connection settings, run time, terminals and database sizing"""
+    host = database_config.get('host', 'localhost')
+    port = database_config.get('port', '5432')
+    database = database_config.get('database', 'benchbase')
+    values = {
+        'url': f"jdbc:postgresql://{host}:{port}/{database}?sslmode=disable&ApplicationName={benchmark_name}&reWriteBatchedInserts=true",
+        'username': database_config.get('user', 'postgres'),
+        'password': database_config.get('password', ''),
+    }
+    values.update(database_overrides.get(database, {}))
+    values['time'] = benchmark_config.get('benchbase_time', '60')
+    values['terminals'] = benchmark_config.get('benchbase_terminals', '16')
+    return values
@@ -0,0 +1,128 @@
+import csv
+import json
+import os
+import numpy as np
+from latency_histogram import TemplateLatency
+from throughput_stability import analyze
+
+
+def find_output(output_dir, suffix):
+    """BenchBase names its outputs <benchmark>_<timestamp><suffix>"""
+    for file in sorted(os.listdir(output_dir)):
+        if file.endswith(suffix):
+            return os.path.join(output_dir, file)
+    return None
+
+
+def column_index(header, name):
+    for i, column in enumerate(header):
+        if column.strip().lower().startswith(name):
+            return i
+    raise ValueError(f"column '{name}' not found in {header}")
+
+
+def parse_raw_csv(path):
+    """
+    Stream BenchBase's per-transaction raw.csv into per-type latency histograms
+    and a per-second throughput series, without holding the rows in memory.
+    """
+    latency = TemplateLatency()
+    per_second = {}
+    per_second_type = {}
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        name_col = column_index(header, 'transaction name')
+        start_col = column_index(header, 'start time')
+        latency_col = column_index(header, 'latency')
+        for row in reader:
+            if not row:
+                continue
+            name = row[name_col]
+            start = float(row[start_col])
+            # start is written in seconds by current BenchBase, microseconds by older versions
+            if start > 1e12:
+                start /= 1e6
+            second = int(start)
+            latency.record(name, name, float(row[latency_col]) / 1e6)
+            per_second[second] = per_second.get(second, 0) + 1
+            key = (name, second)
+            per_second_type[key] = per_second_type.get(key, 0) + 1
+
+    if not per_second:
+        return None
+    first, last = min(per_second), max(per_second)
+    seconds = np.arange(0, last - first + 1)
+    throughput = np.array([per_second.get(first + s, 0) for s in seconds], dtype=np.float64)
+    types = sorted(latency.templates)
+    type_series = np.array([[per_second_type.get((t, first + s), 0) for s in seconds] for t in types],
+                           dtype=np.float64).reshape(len(types), len(seconds))
+    return {'latency': latency, 'seconds': seconds, 'throughput': throughput,
+            'types': types, 'type_throughput': type_series}
+
+
+def parse_samples_csv(path):
+    """Per-window throughput from samples.csv, used when no raw.csv was written"""
+    seconds, throughput = [], []
+    with open(path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        time_col = column_index(header, 'time')
+        throughput_col = column_index(header, 'throughput')
+        for row in reader:
+            if row:
+                seconds.append(float(row[time_col]))
+                throughput.append(float(row[throughput_col]))
+    return np.array(seconds), np.array(throughput, dtype=np.float64)
+
+
+def ingest_results(output_dir, archive_dir, run_name, noise_threshold=0.05):
+    """
+    Parse the raw BenchBase outputs of one run, store them as a compressed
+    columnar .npz in archive_dir and return a JSON-friendly summary with
+    overall and per-transaction-type throughput, latency percentiles and
+    the steady-state analysis of the throughput series.
+    """
+    raw_path = find_output(output_dir, '.raw.csv')
+    samples_path = find_output(output_dir, '.samples.csv')
+    summary = {'run': run_name}
+    columns = {}
+
+    parsed = parse_raw_csv(raw_path) if raw_path else None
+    if parsed is not None:
+        duration = max(len(parsed['seconds']), 1)
+        latency = parsed['latency'].to_dict()
+        summary['latency'] = latency
+        summary['throughput'] = parsed['latency'].overall.count / duration
+        summary['txn_throughput'] = {t: parsed['latency'].templates[t].count / duration for t in parsed['types']}
+        columns.update({
+            'seconds': parsed['seconds'],
+            'throughput': parsed['throughput'],
+            'txn_types': np.array(parsed['types']),
+            'txn_throughput': parsed['type_throughput'],
+            'txn_latency': np.array([[latency['templates'][t][p] for p in ('mean', 'p50', 'p95', 'p99', 'max')]
+                                     for t in parsed['types']], dtype=np.float64).reshape(len(parsed['types']), 5),
+        })
+    elif samples_path:
+        seconds, throughput = parse_samples_csv(samples_path)
+        columns.update({'seconds': seconds, 'throughput': throughput})
+    else:
+        print(f'No raw.csv or samples.csv found in {output_dir}')
+        return None
+
+    summary['series'] = columns['throughput'].tolist()
+    summary['stability'] = analyze(columns['throughput'], noise_threshold)
+    os.makedirs(archive_dir, exist_ok=True)
+    npz_path = os.path.join(archive_dir, f'{run_name}.npz')
+    np.savez_compressed(npz_path, **columns)
+    with open(os.path.join(archive_dir, f'{run_name}.json'), 'w') as f:
+        json.dump({k: v for k, v in summary.items() if k != 'series'}, f, indent=2)
+    summary['npz_path'] = npz_path
+    print(f'Stored BenchBase metrics to {npz_path}')
+    return summary
+
+
+def load_results(npz_path):
+    """Columns of an ingested run as a dict of numpy arrays"""
+    with np.load(npz_path) as data:
+        return {k: data[k] for k in data.files}
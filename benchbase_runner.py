@@ -2,17 +2,51 @@ import os
 import logging
 import time
 import json
+import shlex
 import shutil
-import re
+import tempfile
+from benchbase_config import get_template, run_values
+from benchbase_results import ingest_results
+from instrumentation import span
+from benchbase_service import ServiceRun, get_service
+from process_runner import ManagedProcess
+
+class BenchBaseRun:
+    """State of one BenchBase execution started by BenchBaseRunner.start_benchmark"""
+    def __init__(self, benchmark_name, workload_path, results_dir, output_dir, config_file, process):
+        self.benchmark_name = benchmark_name
+        self.workload_path = workload_path
+        self.results_dir = results_dir
+        self.output_dir = output_dir
+        self.config_file = config_file
+        self.process = process
+
 
 class BenchBaseRunner:
     def __init__(self, args, logger=None):
         self.benchmark_config = args['benchmark_config']
         self.database_config = args['database_config']
         self.logger = logger or logging.getLogger(__name__)
+        self.benchbase_jar = os.path.abspath(self.benchmark_config.get('benchbase_jar', './benchbase/target/benchbase-postgres/benchbase.jar'))
+        # BenchBase resolves config/ and lib/ relative to the directory holding the jar
+        self.benchbase_root = os.path.abspath(self.benchmark_config.get('benchbase_root', os.path.dirname(self.benchbase_jar)))
+        self.jvm_opts = shlex.split(self.benchmark_config.get('jvm_opts', ''))
+        # seconds before a BenchBase run is cancelled, 0 waits forever
+        self.timeout = float(self.benchmark_config.get('benchbase_timeout', 900))
+        # run inside a persistent BenchBase JVM instead of starting java per evaluation
+        self.warm_jvm = self.benchmark_config.get('warm_jvm', 'false').lower() == 'true'
+        # relative confidence half-width above which a run is flagged noisy
+        self.noise_threshold = float(self.benchmark_config.get('noise_threshold', 0.05))
+        # per-transaction latency and throughput of the last finished run, see benchbase_results
+        self.last_result = None
     
     def run_benchmark(self, workload_path, log_file):
         # Run BenchBase benchmark and return throughput
+        run = self.start_benchmark(workload_path, log_file)
+        return self.wait_benchmark(run)
+
+    def start_benchmark(self, workload_path, log_file):
+        """Start BenchBase without blocking, several runs can proceed concurrently"""
         # Get benchmark name from config.ini
         benchmark_name = self.benchmark_config.get('benchmark', 'tpcc')
         
@@ -27,59 +61,99 @@ class BenchBaseRunner:
         
         # Convert to absolute path to avoid permission issues
         workload_results_dir = os.path.abspath(workload_results_dir)
-        
-        # Copy config to BenchBase directory and get the new path
-        benchbase_config, benchbase_dir = self.copy_config_to_benchbase(workload_path, benchmark_name)
-        
-        # Use run_benchmark.sh script with results going to our directory
-        script_path = os.path.abspath('run_benchmark.sh')
+
+        # Every run writes into its own output directory so concurrent runs do not collide
         timestamp = int(time.time())
+        output_dir = tempfile.mkdtemp(prefix=f"run_{timestamp}_", dir=workload_results_dir)
+        
+        # Render the config for this run from the cached workload template
+        benchbase_config = self.render_config(workload_path, benchmark_name, output_dir)
         
-        # The script expects: BENCHNAME TIMESTAMP OUTPUTDIR OUTPUTLOG CONFIGFILE
         config_filename = os.path.basename(workload_path)
-        command = f'bash {script_path} {benchmark_name.lower()} {timestamp} {workload_results_dir} {workload_results_dir} {config_filename}'
+        command = ['java'] + self.jvm_opts + [
+            '-jar', self.benchbase_jar,
+            '-b', benchmark_name.lower(),
+            '-c', benchbase_config,
+            '--execute=true',
+            f'--directory={output_dir}',
+            # 1 second windows for the throughput series in samples.csv
+            '--sample=1',
+        ]
         
         print(f'Running BenchBase with benchmark: {benchmark_name}')
         print(f'Config file: {config_filename} ')
         print(f'Results will be saved to: {workload_results_dir}')
         
-        state = os.system(command)
-        
-        # Cleanup - remove the copied config file
-        # self.cleanup_config(benchbase_config)
-        
-        if state == 0:
-            print('BenchBase running success')
+        log_path = os.path.join(output_dir, f'{benchmark_name.lower()}_{timestamp}.log')
+        if self.warm_jvm:
+            # same arguments, executed inside the long-lived JVM instead of a fresh one
+            service = get_service(self.benchbase_jar, self.benchbase_root, self.jvm_opts)
+            process = ServiceRun(service, command[len(self.jvm_opts) + 3:], log_path, timeout=self.timeout or None)
         else:
-            print(f'BenchBase running error - exit code: {state}')
+            process = ManagedProcess(command, cwd=self.benchbase_root, log_path=log_path,
+                                     timeout=self.timeout or None)
+        process.start()
+        return BenchBaseRun(benchmark_name, workload_path, workload_results_dir, output_dir, benchbase_config, process)
+
+    def wait_benchmark(self, run):
+        """Wait for a run started by start_benchmark and return its throughput"""
+        self.last_result = None
+        with span('benchbase.run'):
+            state = run.process.wait()
+        
+        if state == 0 and not run.process.cancelled:
+            print(f'BenchBase running success in {run.process.elapsed():.1f} seconds')
+        else:
+            reason = 'timed out' if run.process.timed_out else f'exit code: {state}'
+            print(f'BenchBase running error - {reason}')
+            for line in list(run.process.stderr_tail)[-20:]:
+                print(f'  {line}')
             return 0.0
 
-        # sleep for a while to ensure files are written
-        time.sleep(5)
-        
+        # Ingest raw.csv/samples.csv before the cleanup below deletes them
+        run_name = os.path.basename(run.output_dir)
+        try:
+            with span('benchbase.ingest'):
+                self.last_result = ingest_results(run.output_dir, os.path.join(run.results_dir, 'metrics'), run_name,
+                                                  self.noise_threshold)
+            stability = self.last_result.get('stability') if self.last_result else None
+            if stability is not None:
+                print(f"Steady-state throughput: {stability['steady_throughput']:.2f} "
+                      f"[{stability['ci_low']:.2f}, {stability['ci_high']:.2f}] after {stability['warmup_seconds']}s warm-up"
+                      f"{' (noisy)' if stability['noisy'] else ''}")
+        except Exception as e:
+            print(f'Error ingesting BenchBase results: {e}')
+            self.last_result = None
+
         # Clean up results and find summary.json
-        summary_path = self.clean_and_find_summary(workload_results_dir)
+        summary_path = self.clean_and_find_summary(run.results_dir, run.output_dir)
         if not summary_path:
             print('No summary.json found in results')
             return 0.0
         
         # Parse throughput from summary.json
         throughput = self.parse_summary_json(summary_path)
-        print(f'BenchBase {benchmark_name} throughput: {throughput}')
+        print(f'BenchBase {run.benchmark_name} throughput: {throughput}')
         
         return throughput
+
+    def cancel(self, run):
+        """Stop a running BenchBase process and its JVM"""
+        run.process.cancel()
     
-    def clean_and_find_summary(self, results_dir):
+    @span('benchbase.summary')
+    def clean_and_find_summary(self, results_dir, output_dir=None):
         """Find summary.json file, archive it in summary/ subdirectory, and delete everything else."""
         summary_path = None
+        output_dir = output_dir or results_dir
         
         # Create summary subdirectory
         summary_archive_dir = os.path.join(results_dir, 'summary')
         os.makedirs(summary_archive_dir, exist_ok=True)
         
         # Find .summary.json file and remove others
-        for file in os.listdir(results_dir):
-            file_path = os.path.join(results_dir, file)
+        for file in os.listdir(output_dir):
+            file_path = os.path.join(output_dir, file)
             if file.endswith('.summary.json'):
                 # Archive the original summary file with its timestamp name
                 archived_path = os.path.join(summary_archive_dir, file)
@@ -89,13 +163,17 @@ class BenchBaseRunner:
                 # Also save as 'summary.json' in main directory
                 final_summary_path = os.path.join(results_dir, 'summary.json')
                 shutil.move(file_path, final_summary_path)
-                summary_path = final_summary_path
+                # parse the archived copy, summary.json may be replaced by a concurrent run
+                summary_path = archived_path
                 print(f'Saved summary file as: {final_summary_path}')
             else:
                 # Delete everything else (except our summary subdirectory)
                 if os.path.isfile(file_path):
                     os.remove(file_path)
                     print(f'Removed file: {file_path}')
+
+        if output_dir != results_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
         
         return summary_path
     
@@ -115,82 +193,15 @@ class BenchBaseRunner:
             print(f'Error parsing summary.json: {e}')
             return 0.0
     
-    def update_config_file(self, config_file, benchmark_name):
-        # Update BenchBase XML config with database settings using string replacement to preserve comments
-        try:
-            # Read the file as text
-            with open(config_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Update database connection values
-            host = self.database_config.get('host', 'localhost')
-            port = self.database_config.get('port', '5432')
-            database = self.database_config.get('database', 'benchbase')
-            username = self.database_config.get('user', 'postgres')
-            password = self.database_config.get('password', '')
-            
-            new_url = f"jdbc:postgresql://{host}:{port}/{database}?sslmode=disable&amp;ApplicationName={benchmark_name}&amp;reWriteBatchedInserts=true"
-            
-            # Update URL
-            content = re.sub(r'<url>.*?</url>', f'<url>{new_url}</url>', content)
-            
-            # Update username
-            content = re.sub(r'<username>.*?</username>', f'<username>{username}</username>', content)
-            
-            # Update password
-            content = re.sub(r'<password>.*?</password>', f'<password>{password}</password>', content)
-            
-            if database == 'ycsb':
-                # update the scaling factor to 3600 for more challenging workload
-                content = re.sub(r'<scalefactor>.*?</scalefactor>', '<scalefactor>3600</scalefactor>', content)
-                # update rate to 15000
-                content = re.sub(r'<rate>.*?</rate>', '<rate>70000</rate>', content)
-            if database == 'wikipedia':
-                content = re.sub(r'<rate>.*?</rate>', '<rate>unlimited</rate>', content)
-                # set scale factor to 22
-                content = re.sub(r'<scalefactor>.*?</scalefactor>', '<scalefactor>22</scalefactor>', content)
-            if database == 'twitter':
-                content = re.sub(r'<scalefactor>.*?</scalefactor>', '<scalefactor>80</scalefactor>', content)
-                content = re.sub(r'<rate>.*?</rate>', '<rate>unlimited</rate>', content)
-            if database == 'smallbank':
-                content = re.sub(r'<scalefactor>.*?</scalefactor>', '<scalefactor>45</scalefactor>', content)
-                content = re.sub(r'<rate>.*?</rate>', '<rate>unlimited</rate>', content)
-
-            content = re.sub(r'<time>.*?</time>', '<time>60</time>', content)
-            # Update terminals
-            content = re.sub(r'<terminals>.*?</terminals>', '<terminals>16</terminals>', content)
-            
-            # Write back to file
-            with open(config_file, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            print(f'Updated config file: {config_file} (preserving comments)')
-            
-        except Exception as e:
-            print(f'Error updating config file {config_file}: {e}')
-    
-    def copy_config_to_benchbase(self, workload_path, benchmark_name):
-        # Update original config file first, then copy to BenchBase config directory
-    
-        # Update the original config file with database settings
-        self.update_config_file(workload_path, benchmark_name)
-        
-        # Get BenchBase directory and config path
-        benchbase_jar = self.benchmark_config.get('benchbase_jar', './benchbase/target/benchbase-postgres/benchbase.jar')
-        benchbase_dir = os.path.dirname(os.path.dirname(benchbase_jar))  # Go up two levels from jar to benchbase root
-        
-        # Create the config directory path: target/benchbase-postgres/config/postgres
-        config_dir = os.path.join(benchbase_dir, 'benchbase-postgres', 'config', 'postgres')
-        os.makedirs(config_dir, exist_ok=True)
-        
-        # Copy with the actual filename
-        config_filename = os.path.basename(workload_path)
-        benchbase_config = os.path.join(config_dir, config_filename)
-        
-        shutil.copy2(workload_path, benchbase_config)
-        print(f"Copied updated config to BenchBase config directory: {benchbase_config}")
-        
-        return benchbase_config, benchbase_dir
+    @span('benchbase.render')
+    def render_config(self, workload_path, benchmark_name, output_dir):
+        # Render the per-run config into the private run directory, the workload XML is never modified
+        template = get_template(workload_path)
+        values = run_values(self.database_config, self.benchmark_config, benchmark_name)
+        config_file = os.path.join(output_dir, os.path.basename(workload_path))
+        template.render_to_file(values, config_file)
+        print(f"Rendered BenchBase config: {config_file}")
+        return config_file
     
     def cleanup_config(self, config_file):
         # Remove the temporary config file
@@ -0,0 +1,180 @@
+import atexit
+import collections
+import itertools
+import os
+import threading
+import time
+from process_runner import ManagedProcess
+
+service_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'BenchBaseService.java')
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+class ServiceRun:
+    """
+    One BenchBase execution inside the warm service.
+    Exposes the same wait/cancel/elapsed interface as ManagedProcess so
+    BenchBaseRunner can treat cold and warm runs alike.
+    """
+    def __init__(self, service, args, log_path, timeout=None, tail_lines=200):
+        self.service = service
+        self.args = args
+        self.log_path = log_path
+        self.timeout = timeout
+        self.id = None
+        self.returncode = None
+        self.timed_out = False
+        self.cancelled = False
+        self.start_time = None
+        self.end_time = None
+        self.stdout_tail = collections.deque(maxlen=tail_lines)
+        self.stderr_tail = collections.deque(maxlen=tail_lines)
+        self.done = threading.Event()
+        self.log = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.service.execute, args=(self,), daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.returncode
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        # a run cannot be interrupted inside the JVM, so the whole service is restarted
+        if self.running():
+            self.cancelled = True
+            self.service.restart()
+
+    def elapsed(self):
+        end = self.end_time or time.time()
+        return end - self.start_time if self.start_time else 0.0
+
+
+class BenchBaseService:
+    """
+    Long-lived BenchBase JVM that accepts run requests on stdin.
+    Repeated evaluations skip JVM startup, classloading and JIT warm-up, so the
+    measured window starts with warm code. Runs are executed one at a time.
+    """
+    def __init__(self, benchbase_jar, benchbase_root, jvm_opts=None, log_path=None, startup_timeout=120):
+        self.benchbase_jar = benchbase_jar
+        self.benchbase_root = benchbase_root
+        self.jvm_opts = list(jvm_opts or [])
+        self.log_path = log_path or os.path.join(benchbase_root, 'benchbase_service.log')
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.ready = threading.Event()
+        self.current = None
+        self.run_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.starts = 0
+
+    def start(self):
+        with self.state_lock:
+            if self.process is not None and self.process.running():
+                return
+            classpath = os.pathsep.join([self.benchbase_jar, os.path.join(self.benchbase_root, 'lib', '*')])
+            command = ['java'] + self.jvm_opts + ['-cp', classpath, service_source]
+            self.ready.clear()
+            self.process = ManagedProcess(command, cwd=self.benchbase_root, log_path=self.log_path)
+            self.process.on_line(self.handle_line)
+            self.process.start()
+            self.starts += 1
+        print(f'Starting warm BenchBase service (start #{self.starts})...')
+        if not self.ready.wait(self.startup_timeout):
+            self.stop()
+            raise RuntimeError(f'BenchBase service did not become ready within {self.startup_timeout} seconds, see {self.log_path}')
+        print('BenchBase service is ready')
+
+    def handle_line(self, stream, line):
+        if line.startswith('@@SERVICE READY'):
+            self.ready.set()
+            return
+        run = self.current
+        if line.startswith('@@SERVICE DONE'):
+            _, _, run_id, rc, _ = line.split()
+            if run is not None and str(run.id) == run_id:
+                run.returncode = int(rc)
+                run.done.set()
+            return
+        if run is None:
+            return
+        (run.stdout_tail if stream == 'stdout' else run.stderr_tail).append(line.rstrip('\n'))
+        if run.log is not None:
+            run.log.write(line if stream == 'stdout' else f'[stderr] {line}')
+
+    def execute(self, run):
+        with self.run_lock:
+            run.start_time = time.time()
+            try:
+                self.start()
+                process = self.process
+                os.makedirs(os.path.dirname(os.path.abspath(run.log_path)), exist_ok=True)
+                run.log = open(run.log_path, 'a')
+                run.id = next(self.ids)
+                self.current = run
+                process.write('\t'.join(['RUN', str(run.id)] + run.args) + '\n')
+                deadline = time.time() + run.timeout if run.timeout else None
+                while not run.done.wait(1.0):
+                    if not process.running():
+                        # the service died mid-run, e.g. System.exit inside BenchBase
+                        code = process.wait()
+                        run.returncode = -1 if run.cancelled else code
+                        break
+                    if deadline is not None and time.time() > deadline:
+                        print(f'BenchBase run exceeded timeout of {run.timeout} seconds, restarting service')
+                        run.timed_out = True
+                        run.cancelled = True
+                        run.returncode = -1
+                        self.stop()
+                        break
+            except Exception as e:
+                print(f'BenchBase service error: {e}')
+                run.returncode = -1
+            finally:
+                self.current = None
+                if run.log is not None:
+                    run.log.close()
+                run.end_time = time.time()
+
+    def restart(self):
+        self.stop()
+
+    def stop(self):
+        with self.state_lock:
+            if self.process is None:
+                return
+            if self.process.running():
+                try:
+                    self.process.write('QUIT\n')
+                    self.process.wait(timeout=10)
+                except Exception:
+                    self.process.cancel()
+            self.process.wait()
+            self.process = None
+
+
+def get_service(benchbase_jar, benchbase_root, jvm_opts=None):
+    """Shared service per BenchBase install and JVM options, stopped at interpreter exit"""
+    key = (benchbase_jar, benchbase_root, tuple(jvm_opts or []))
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = BenchBaseService(benchbase_jar, benchbase_root, jvm_opts)
+            _services[key] = service
+    return service
+
+
+@atexit.register
+def stop_services():
+    for service in list(_services.values()):
+        service.stop()
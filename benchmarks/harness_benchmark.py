@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the tuning harness itself, no PostgreSQL server or BenchBase needed.
+
+Database connections are replaced by the stand-in of mock_backend and
+pg_ctlcluster calls by no-ops, so the timings are the harness overhead of
+each hot path: change_knob, restart/reset, metrics fetch, plan extraction,
+surrogate prediction, sample ingestion, run_config on the mock backend and
+a surrogate-mode SMAC session. Results are written as a JSON report for
+tracking regressions between commits.
+
+    python benchmarks/harness_benchmark.py --repeat 50 --output benchmarks/results/latest.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+import numpy as np
+import Database
+from metrics_collector import MetricsCollector
+from sample_sink import SampleSink
+from benchbase_results import ingest_results
+from mock_backend import StandInConnection
+
+knob_config = os.path.join(project_root, 'knob_config', 'knob_config_pg14.json')
+
+
+def make_args(tmp_dir, model_path):
+    return {
+        'database_config': {'host': 'localhost', 'port': '5432', 'database': 'bench', 'user': 'postgres',
+                            'password': '', 'data_path': tmp_dir},
+        'tuning_config': {'knob_config': knob_config, 'log_path': os.path.join(tmp_dir, 'tune.log')},
+        'benchmark_config': {'benchmark': 'tpch', 'tool': 'dwg', 'log_path': os.path.join(tmp_dir, 'olap.log'),
+                             'thread': '4', 'sample_path': os.path.join(tmp_dir, 'offline_sample.jsonl'),
+                             'timing_log': os.path.join(tmp_dir, 'phase_timings.jsonl'),
+                             'baseline_cache': 'false'},
+        'surrogate_config': {'model_path': model_path},
+    }
+
+
+def measure(fn, repeat):
+    """Wall-clock statistics of repeat calls of fn"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    total = sum(durations)
+    return {
+        'runs': repeat,
+        'total_s': total,
+        'mean_ms': 1000 * total / repeat,
+        'p50_ms': 1000 * durations[len(durations) // 2],
+        'p95_ms': 1000 * durations[min(len(durations) - 1, int(0.95 * len(durations)))],
+        'stdev_ms': 1000 * statistics.stdev(durations) if repeat > 1 else 0.0,
+        'ops_per_s': repeat / total if total else float('inf'),
+    }
+
+
+def default_knobs(db):
+    return {name: detail['default'] for name, detail in db.knobs.items()}
+
+
+def train_model(n_features, path):
+    from sklearn.ensemble import RandomForestRegressor
+    import joblib
+    rng = np.random.default_rng(0)
+    model = RandomForestRegressor(n_estimators=100, random_state=0)
+    model.fit(rng.random((500, n_features)), rng.random(500))
+    joblib.dump({'model': model, 'y_min': 0.0, 'y_max': 1000.0}, path)
+
+
+def write_raw_csv(output_dir, seconds=60, rate=2000):
+    rng = np.random.default_rng(0)
+    with open(os.path.join(output_dir, 'tpcc_0.raw.csv'), 'w') as f:
+        f.write("Transaction Type Index,Transaction Name,Start Time (microseconds),Latency (microseconds),"
+                "Worker Id (start number),Phase Id (index in config file)\n")
+        names = ['NewOrder', 'Payment', 'OrderStatus', 'Delivery', 'StockLevel']
+        for i in range(seconds * rate):
+            f.write(f"1,{names[i % 5]},{1700000000 + i / rate:.6f},{int(rng.exponential(5000))},{i % 16},0\n")
+
+
+def run_benchmarks(repeat, tmp_dir):
+    results = {}
+    collector = MetricsCollector()
+    connect = mock.patch.object(Database.Database, 'get_conn', lambda self, max_retries=3: StandInConnection(collector))
+    no_pg_ctl = mock.patch.object(Database.subprocess, 'run', lambda *a, **k: subprocess.CompletedProcess(a, 0, '', ''))
+    no_sleep = mock.patch.object(Database.time, 'sleep', lambda seconds: None)
+
+    with connect, no_pg_ctl, no_sleep, mock.patch('builtins.print'):
+        db = Database.Database(config=make_args(tmp_dir, ''), path=knob_config)
+        knobs = default_knobs(db)
+        results['change_knob'] = measure(lambda: db.change_knob(knobs), repeat)
+        results['restart_db'] = measure(db.restart_db, repeat)
+        results['reset_inner_metrics'] = measure(db.reset_inner_metrics, repeat)
+        results['fetch_inner_metrics'] = measure(db.fetch_inner_metrics, repeat)
+        queries = [f"SELECT * FROM lineitem WHERE l_orderkey = {i}" for i in range(22)]
+        results['extract_query_plans_22'] = measure(lambda: db.extract_query_plans(queries), repeat)
+
+    results['surrogate_predict'] = bench_surrogate(repeat, tmp_dir, db, knobs)
+    results['sample_sink_1000'] = bench_sample_sink(repeat, tmp_dir)
+    results['benchbase_ingest_120k_rows'] = bench_ingest(max(1, repeat // 10), tmp_dir)
+    results['mock_run_config'] = bench_mock_pipeline(repeat, tmp_dir)
+    results['smac_surrogate_session'] = bench_smac_session(tmp_dir, db, knobs)
+    return results
+
+
+def bench_surrogate(repeat, tmp_dir, db, knobs):
+    try:
+        model_path = os.path.join(tmp_dir, 'surrogate.pkl')
+        # same feature layout as run_config_surrogate: knobs with a non-empty range, then inner metrics
+        n_knobs = sum(1 for detail in db.knobs.values() if detail['max'] != detail['min'])
+        train_model(n_knobs + len(MetricsCollector().names), model_path)
+    except ImportError as e:
+        return {'skipped': str(e)}
+    from workload_executor import workload_executor
+    with mock.patch('builtins.print'):
+        executor = workload_executor(make_args(tmp_dir, model_path), None, 'records.log',
+                                     {name: 1.0 for name in MetricsCollector().names})
+        return measure(lambda: executor.run_config_surrogate(knobs, 'bench.wg'), repeat * 10)
+
+
+def bench_sample_sink(repeat, tmp_dir):
+    sample = {'y': [-100.0, -0.01], 'inner_metrics': [1.0] * 14, 'workload': 'bench.wg'}
+
+    def write_batch():
+        sink = SampleSink(os.path.join(tmp_dir, 'sink.jsonl'), batch_size=50, flush_interval=1.0)
+        for _ in range(1000):
+            sink.write(sample)
+        sink.close()
+    return measure(write_batch, max(1, repeat // 5))
+
+
+def bench_ingest(repeat, tmp_dir):
+    output_dir = tempfile.mkdtemp(dir=tmp_dir)
+    write_raw_csv(output_dir)
+    with mock.patch('builtins.print'):
+        return measure(lambda: ingest_results(output_dir, os.path.join(tmp_dir, 'metrics'), 'bench'), repeat)
+
+
+def bench_mock_pipeline(repeat, tmp_dir):
+    """Full run_config evaluations (knob change, run, sample write) against the mock backend"""
+    from workload_executor import workload_executor
+    args = make_args(tmp_dir, '')
+    args['benchmark_config']['backend'] = 'mock'
+    with mock.patch('builtins.print'):
+        executor = workload_executor(args, None, 'records.log', {name: 1.0 for name in MetricsCollector().names})
+        surface_knobs = default_knobs(executor.db)
+        result = measure(lambda: executor.run_config(surface_knobs, 'bench.wg'), repeat * 10)
+        executor.sample_sink.close()
+    result['evaluations_per_min'] = 60 * result['ops_per_s']
+    return result
+
+
+def bench_smac_session(tmp_dir, db, knobs):
+    """One full 100-evaluation surrogate-mode SMAC session, in a scratch directory"""
+    try:
+        import tune
+    except ImportError as e:
+        return {'skipped': str(e)}
+    model_path = os.path.join(tmp_dir, 'surrogate.pkl')
+    if not os.path.exists(model_path):
+        return {'skipped': 'no surrogate model'}
+    cwd = os.getcwd()
+    os.chdir(tmp_dir)
+    try:
+        with mock.patch('builtins.print'):
+            instance = tune.tuner(make_args(tmp_dir, model_path), 'bench.wg',
+                                  {name: 1.0 for name in MetricsCollector().names}, use_surrogate=True)
+            return measure(instance.tune, 1)
+    finally:
+        os.chdir(cwd)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=project_root).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the hot paths of the tuning harness')
+    parser.add_argument('--repeat', type=int, default=20, help='repetitions per benchmark')
+    parser.add_argument('--output', type=str, default=None, help='JSON report path, default benchmarks/results/harness_<time>.json')
+    cmd = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='harness_benchmark_')
+    results = run_benchmarks(cmd.repeat, tmp_dir)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': cmd.repeat,
+        'results': results,
+    }
+
+    output = cmd.output or os.path.join('benchmarks', 'results', f"harness_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'benchmark':<30}{'mean ms':>12}{'p95 ms':>12}{'ops/s':>12}")
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<30}  skipped: {result['skipped']}")
+        else:
+            print(f"{name:<30}{result['mean_ms']:>12.3f}{result['p95_ms']:>12.3f}{result['ops_per_s']:>12.1f}")
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
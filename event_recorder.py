@@ -0,0 +1,68 @@
+import json
+import os
+import time
+
+
+class EventRecorder:
+    """
+    In-memory event buffer owned by a single OLAP worker.
+    Recording only appends a tuple, nothing touches stdout or disk until the
+    run report is written once after all workers finished.
+    """
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.origin = time.perf_counter()
+        self.events = []
+        self.processed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def sql(self, index, latency):
+        self.processed += 1
+        self.events.append((time.perf_counter() - self.origin, 'sql', index, latency))
+
+    def error(self, index, sql, error):
+        self.failed += 1
+        self.events.append((time.perf_counter() - self.origin, 'error', index, f"{error} | {sql[:200]}"))
+
+    def timeout(self, index, latency):
+        self.timed_out += 1
+        self.events.append((time.perf_counter() - self.origin, 'timeout', index, latency))
+
+    def skip(self, index, count):
+        # statements left unexecuted because the run budget was exhausted
+        self.skipped += count
+        self.events.append((time.perf_counter() - self.origin, 'skipped', index, count))
+
+    def unfinished(self):
+        # failed statements count too, a configuration that breaks queries must not look fast
+        return self.failed + self.timed_out + self.skipped
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.origin
+
+    def to_dict(self):
+        return {
+            "worker_id": self.worker_id,
+            "processed": self.processed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "skipped": self.skipped,
+            "elapsed": self.elapsed,
+            "events": [list(e) for e in self.events],
+        }
+
+
+def write_run_report(path, summary, recorders):
+    """Merge all worker recorders into one structured JSON report"""
+    report = dict(summary)
+    # "workers" is the worker count of the summary, the per-worker events go next to it
+    report["worker_events"] = [r.to_dict() for r in sorted(recorders, key=lambda r: r.worker_id)]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f)
+    return report
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+clock_ticks = os.sysconf('SC_CLK_TCK')
+page_size = os.sysconf('SC_PAGE_SIZE')
+
+
+def read_cpu():
+    """Cumulative (busy, iowait, total) jiffies from the aggregate cpu line of /proc/stat"""
+    with open('/proc/stat') as f:
+        fields = [int(v) for v in f.readline().split()[1:9]]
+    user, nice, system, idle, iowait, irq, softirq, steal = fields
+    total = sum(fields)
+    return total - idle - iowait, iowait, total
+
+
+def read_meminfo():
+    values = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            name, value = line.split(':', 1)
+            values[name] = int(value.split()[0]) * 1024
+    return values
+
+
+def block_devices():
+    """
+    Whole physical disks only: partitions, and virtual devices stacked on the disks
+    (dm-* for LVM, md* for RAID, nbd*, loop, ram), would count the same I/O twice.
+    A physical disk is one with a /sys/block/<d>/device link.
+    """
+    try:
+        return {d for d in os.listdir('/sys/block') if os.path.exists(os.path.join('/sys/block', d, 'device'))}
+    except OSError:
+        return set()
+
+
+def read_disks(devices):
+    """Cumulative sectors read, sectors written and ms spent doing I/O per device"""
+    disks = {}
+    with open('/proc/diskstats') as f:
+        for line in f:
+            fields = line.split()
+            if fields[2] in devices:
+                disks[fields[2]] = (int(fields[5]), int(fields[9]), int(fields[12]))
+    return disks
+
+
+def read_network():
+    """Cumulative received and transmitted bytes over all interfaces except loopback"""
+    rx = tx = 0
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            name, data = line.split(':', 1)
+            if name.strip() == 'lo':
+                continue
+            fields = data.split()
+            rx += int(fields[0])
+            tx += int(fields[8])
+    return rx, tx
+
+
+def read_processes(names):
+    """Cumulative CPU ticks and current resident bytes per pid, grouped by process name"""
+    usage = {name: {} for name in names}
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                data = f.read()
+        except OSError:
+            continue
+        # comm is parenthesized and may contain spaces
+        comm = data[data.index('(') + 1:data.rindex(')')]
+        if comm not in usage:
+            continue
+        fields = data[data.rindex(')') + 2:].split()
+        usage[comm][pid] = (int(fields[11]) + int(fields[12]), int(fields[21]) * page_size)
+    return usage
+
+
+class HostSampler:
+    """
+    Background thread sampling host CPU, memory, disk, network and the
+    postgres/java processes from /proc every interval_ms while a run executes.
+    Only meaningful when the database runs on the tuning host.
+    """
+    def __init__(self, interval_ms=1000, process_names=('postgres', 'java')):
+        self.interval = interval_ms / 1000.0
+        self.process_names = process_names
+        self.devices = block_devices()
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.last = self.read()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self
+
+    def run(self):
+        try:
+            while not self.stop_event.wait(self.interval):
+                self.tick()
+            self.tick()
+        except Exception as e:
+            print(f"Host sampler stopped: {e}")
+
+    def read(self):
+        return {
+            'time': time.time(),
+            'cpu': read_cpu(),
+            'mem': read_meminfo(),
+            'disks': read_disks(self.devices),
+            'net': read_network(),
+            'procs': read_processes(self.process_names),
+        }
+
+    def tick(self):
+        current = self.read()
+        last, self.last = self.last, current
+        elapsed = current['time'] - last['time']
+        if elapsed <= 0:
+            return
+        busy, iowait, total = (c - l for c, l in zip(current['cpu'], last['cpu']))
+        total = total or 1
+        mem = current['mem']
+        sample = {
+            'cpu_util': 100.0 * busy / total,
+            'cpu_iowait': 100.0 * iowait / total,
+            'mem_used': 100.0 * (1 - mem.get('MemAvailable', 0) / mem['MemTotal']),
+            'mem_dirty_mb': mem.get('Dirty', 0) / 2 ** 20,
+            'disk_read_mbps': 0.0,
+            'disk_write_mbps': 0.0,
+            'disk_util': 0.0,
+            'net_rx_mbps': (current['net'][0] - last['net'][0]) / elapsed / 2 ** 20,
+            'net_tx_mbps': (current['net'][1] - last['net'][1]) / elapsed / 2 ** 20,
+        }
+        for device, (read, written, io_ms) in current['disks'].items():
+            if device not in last['disks']:
+                continue
+            last_read, last_written, last_io_ms = last['disks'][device]
+            # diskstats sectors are always 512 bytes
+            sample['disk_read_mbps'] += (read - last_read) * 512 / elapsed / 2 ** 20
+            sample['disk_write_mbps'] += (written - last_written) * 512 / elapsed / 2 ** 20
+            sample['disk_util'] = max(sample['disk_util'], min(100.0, (io_ms - last_io_ms) / (elapsed * 10)))
+        for name, pids in current['procs'].items():
+            # diff per pid, backends that exited since the last tick would otherwise make the sum drop.
+            # A pid missing from the last snapshot started in this interval, so all its ticks count.
+            last_pids = last['procs'][name]
+            ticks = sum(max(0, t - last_pids[pid][0]) if pid in last_pids else t for pid, (t, _) in pids.items())
+            # cores busy in that process name, can exceed 1 for multi-process postgres
+            sample[f'{name}_cpu_cores'] = ticks / clock_ticks / elapsed
+            sample[f'{name}_rss_mb'] = sum(rss for _, rss in pids.values()) / 2 ** 20
+        self.samples.append(sample)
+
+    def summary(self):
+        """Mean and max of every utilization metric over the run"""
+        if not self.samples:
+            return {}
+        result = {'samples': len(self.samples)}
+        for name in self.samples[0]:
+            values = [s[name] for s in self.samples]
+            result[f'{name}_mean'] = sum(values) / len(values)
+            result[f'{name}_max'] = max(values)
+        return result
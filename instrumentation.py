@@ -0,0 +1,125 @@
+import functools
+import json
+import os
+import threading
+import time
+
+_local = threading.local()
+_lock = threading.Lock()
+_totals = {}
+_log_path = 'smac_his/phase_timings.jsonl'
+
+
+def configure(log_path):
+    """Set the JSONL file every finished evaluation is appended to"""
+    global _log_path
+    _log_path = log_path
+
+
+def _stack():
+    # open spans of this thread as [name, seconds spent in nested spans]
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def record(name, seconds, parent=None, exclusive=None):
+    """
+    Add a duration measured elsewhere to the current evaluation and the run totals.
+    exclusive is the part not spent in nested spans, all of it by default.
+    """
+    if exclusive is None:
+        exclusive = seconds
+    with _lock:
+        count, total, self_total = _totals.get(name, (0, 0.0, 0.0))
+        _totals[name] = (count + 1, total + seconds, self_total + exclusive)
+    current = getattr(_local, 'evaluation', None)
+    if current is not None:
+        current['phases'][name] = current['phases'].get(name, 0.0) + seconds
+        current['spans'].append({'name': name, 'parent': parent, 'seconds': round(seconds, 6)})
+
+
+class span:
+    """
+    Time a phase: `with span('db.restart'):` or `@span('db.restart')`.
+    Nested spans on the same thread record their parent phase.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1][0] if stack else None
+        stack.append([self.name, 0.0])
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        stack = _stack()
+        _, nested = stack.pop()
+        if stack:
+            stack[-1][1] += self.seconds
+        record(self.name, self.seconds, self.parent, self.seconds - nested)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(self.name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class evaluation:
+    """
+    Group the spans of one configuration evaluation. On exit the phase
+    durations are appended as one JSON line to the timing log. Evaluations
+    are per thread, so concurrent default runs are timed separately.
+    """
+    def __init__(self, label=None):
+        self.label = label
+
+    def __enter__(self):
+        _local.evaluation = {'label': self.label, 'start': time.time(), 'phases': {}, 'spans': []}
+        # the evaluation is the outermost frame, its own time is what no span covers
+        self.stack, _local.stack = _stack(), [['evaluation', 0.0]]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        total = time.perf_counter() - self.start
+        current, _local.evaluation = _local.evaluation, None
+        _, nested = _local.stack[0]
+        _local.stack = self.stack
+        if self.stack:
+            self.stack[-1][1] += total
+        record('evaluation', total, exclusive=total - nested)
+        current['total'] = total
+        current['failed'] = exc[0] is not None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(_log_path)), exist_ok=True)
+            with _lock, open(_log_path, 'a') as f:
+                f.write(json.dumps(current) + '\n')
+        except OSError as e:
+            print(f"Could not write phase timings: {e}")
+
+
+def summary_table():
+    """
+    Text table of count, total, exclusive (self) and mean time per phase. The share
+    is each phase's self time over all timed work, so nested spans are not counted
+    twice and the column adds up to 100%; the evaluation row is the time no span covers.
+    """
+    with _lock:
+        totals = dict(_totals)
+    timed = sum(self_total for _, _, self_total in totals.values()) or 1.0
+    lines = [f"{'phase':<32}{'count':>8}{'total s':>12}{'self s':>12}{'mean s':>10}{'share':>8}"]
+    for name, (count, total, self_total) in sorted(totals.items(), key=lambda item: -item[1][2]):
+        lines.append(f"{name:<32}{count:>8}{total:>12.2f}{self_total:>12.2f}{total / count:>10.2f}"
+                     f"{100 * self_total / timed:>7.1f}%")
+    return '\n'.join(lines)
+
+
+def reset():
+    with _lock:
+        _totals.clear()
@@ -0,0 +1,294 @@
+import argparse
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+states = ['pending', 'running', 'done', 'failed', 'cancelled']
+
+
+class JobQueue:
+    """
+    Durable queue of tuning jobs in a local SQLite file.
+
+    A job is (workload, mode, budget): mode 'surrogate' or 'real' evaluation,
+    budget the number of evaluations (empty for the tuner's default). Workers
+    claim the pending job with the highest priority, oldest first. A failed job
+    goes back to pending with exponential backoff until max_attempts, then
+    stays failed. Running jobs whose heartbeat is older than stale_timeout
+    seconds belong to a dead worker, which counts as a failed attempt.
+    """
+    def __init__(self, path='smac_his/job_queue.db', max_attempts=3, retry_delay=60, stale_timeout=3600):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stale_timeout = stale_timeout
+        self.log_dir = os.path.join(os.path.dirname(os.path.abspath(path)), 'job_logs')
+        os.makedirs(self.log_dir, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workload TEXT,
+                    mode TEXT,
+                    budget INTEGER,
+                    priority INTEGER,
+                    state TEXT,
+                    attempts INTEGER,
+                    max_attempts INTEGER,
+                    worker TEXT,
+                    log_path TEXT,
+                    error TEXT,
+                    result TEXT,
+                    created REAL,
+                    updated REAL,
+                    next_run REAL,
+                    heartbeat REAL
+                )""")
+
+    def connect(self):
+        # autocommit, claim() opens its own write transaction
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def add(self, workload, mode='surrogate', budget=None, priority=0, force=False):
+        """
+        Enqueue a job and return its id. Without force, a workload and mode that is
+        already queued, running or done is not enqueued again and that job's id is returned.
+        """
+        now = time.time()
+        active = "('pending', 'running')" if force else "('pending', 'running', 'done')"
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"SELECT id FROM jobs WHERE workload = ? AND mode = ? AND state IN {active} "
+                               "ORDER BY id DESC", (workload, mode)).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return row[0]
+            job_id = conn.execute(
+                "INSERT INTO jobs (workload, mode, budget, priority, state, attempts, max_attempts, created, updated, next_run) "
+                "VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?)",
+                (workload, mode, budget, priority, self.max_attempts, now, now, now)).lastrowid
+            conn.execute("COMMIT")
+        return job_id
+
+    def claim(self, worker):
+        """Mark the next runnable job as running for worker and return it, None when nothing is runnable"""
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # a lost worker counts as a failed attempt, so a job that kills its worker is not retried forever
+            stale = conn.execute("SELECT id, worker FROM jobs WHERE state = 'running' AND heartbeat < ?",
+                                 (now - self.stale_timeout,)).fetchall()
+            for job_id, worker_name in stale:
+                self.record_failure(conn, job_id, worker_name, f"worker lost: {worker_name}", now)
+            row = conn.execute("SELECT id FROM jobs WHERE state = 'pending' AND next_run <= ? "
+                               "ORDER BY priority DESC, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            log_path = os.path.join(self.log_dir, f"job_{row[0]}.log")
+            conn.execute("UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, log_path = ?, "
+                         "updated = ?, heartbeat = ? WHERE id = ?", (worker, log_path, now, now, row[0]))
+            conn.execute("COMMIT")
+        return self.get(row[0])
+
+    def heartbeat(self, job_id, worker):
+        with self.connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND state = 'running' AND worker = ?",
+                         (time.time(), job_id, worker))
+
+    def complete(self, job_id, worker, result=None):
+        """
+        Mark the job done if worker still holds it. Returns False when the job was
+        reclaimed from a stalled worker meanwhile, the new attempt's state is kept.
+        """
+        with self.connect() as conn:
+            return conn.execute("UPDATE jobs SET state = 'done', result = ?, error = NULL, updated = ? "
+                                "WHERE id = ? AND state = 'running' AND worker = ?",
+                                (json.dumps(result, default=str), time.time(), job_id, worker)).rowcount == 1
+
+    def fail(self, job_id, worker, error):
+        """
+        Record a failed attempt of worker: back to pending after the backoff delay, or
+        failed when out of attempts. Returns False when worker no longer holds the job.
+        """
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            recorded = self.record_failure(conn, job_id, worker, error, time.time())
+            conn.execute("COMMIT")
+        return recorded
+
+    def record_failure(self, conn, job_id, worker, error, now):
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND state = 'running' AND worker = ?",
+                           (job_id, worker)).fetchone()
+        if row is None:
+            return False
+        attempts, max_attempts = row
+        if attempts < max_attempts:
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            conn.execute("UPDATE jobs SET state = 'pending', worker = NULL, error = ?, updated = ?, next_run = ? "
+                         "WHERE id = ?", (error, now, now + delay, job_id))
+        else:
+            conn.execute("UPDATE jobs SET state = 'failed', error = ?, updated = ? WHERE id = ?", (error, now, job_id))
+        return True
+
+    def set_priority(self, job_id, priority):
+        with self.connect() as conn:
+            return conn.execute("UPDATE jobs SET priority = ?, updated = ? WHERE id = ?",
+                                (priority, time.time(), job_id)).rowcount
+
+    def retry(self, job_id):
+        """Put a failed or cancelled job back to pending with a fresh set of attempts"""
+        now = time.time()
+        with self.connect() as conn:
+            return conn.execute("UPDATE jobs SET state = 'pending', attempts = 0, next_run = ?, updated = ? "
+                                "WHERE id = ? AND state IN ('failed', 'cancelled')", (now, now, job_id)).rowcount
+
+    def cancel(self, job_id):
+        """Cancel a pending job, a running job finishes its current attempt"""
+        with self.connect() as conn:
+            return conn.execute("UPDATE jobs SET state = 'cancelled', updated = ? WHERE id = ? AND state = 'pending'",
+                                (time.time(), job_id)).rowcount
+
+    def get(self, job_id):
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def jobs(self, state=None):
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            if state is None:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY priority DESC, id").fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs WHERE state = ? ORDER BY priority DESC, id", (state,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self):
+        with self.connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+def queue_from_config(args):
+    benchmark_config = args['benchmark_config']
+    return JobQueue(benchmark_config.get('job_queue_path', 'smac_his/job_queue.db'),
+                    max_attempts=int(benchmark_config.get('job_max_attempts', 3)),
+                    retry_delay=float(benchmark_config.get('job_retry_delay', 60)),
+                    stale_timeout=float(benchmark_config.get('job_stale_timeout', 3600)))
+
+
+def run_job(job, args):
+    """Tune the job's workload, with its own log file"""
+    from tune import tune
+    with open(job['log_path'], 'a') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        print(f"Job {job['id']} attempt {job['attempts']} on {job['worker']}: {job['workload']} ({job['mode']})")
+        print("Start time for workload (unix seconds):", int(time.time()))
+        try:
+            return tune(workload_file=job['workload'], args=args, use_surrogate=job['mode'] == 'surrogate',
+                        budget=job['budget'])
+        except Exception:
+            traceback.print_exc()
+            raise
+        finally:
+            print("End time for workload (unix seconds):", int(time.time()))
+
+
+def run_worker(job_queue, args, worker=None, once=False, poll_interval=30):
+    """
+    Run jobs until the queue has nothing left (once) or forever, polling every
+    poll_interval seconds. A heartbeat thread keeps the running job claimed.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        job = job_queue.claim(worker)
+        if job is None:
+            counts = job_queue.counts()
+            if once and not counts.get('running') and not counts.get('pending'):
+                print(f"Worker {worker}: no jobs left")
+                return
+            time.sleep(poll_interval)
+            continue
+        print(f"Worker {worker}: job {job['id']} {job['workload']} ({job['mode']}), log {job['log_path']}")
+        stop = threading.Event()
+
+        def beat(job_id=job['id']):
+            while not stop.wait(min(60.0, job_queue.stale_timeout / 4)):
+                job_queue.heartbeat(job_id, worker)
+        heartbeat = threading.Thread(target=beat, daemon=True)
+        heartbeat.start()
+        try:
+            result = run_job(job, args)
+            if job_queue.complete(job['id'], worker, result):
+                print(f"Worker {worker}: job {job['id']} done")
+            else:
+                print(f"Worker {worker}: job {job['id']} was reclaimed by another worker, result dropped")
+        except Exception as e:
+            if job_queue.fail(job['id'], worker, f"{type(e).__name__}: {e}"):
+                print(f"Worker {worker}: job {job['id']} failed: {e}")
+            else:
+                print(f"Worker {worker}: job {job['id']} failed after it was reclaimed by another worker: {e}")
+        finally:
+            stop.set()
+            heartbeat.join()
+
+
+def print_jobs(jobs):
+    print(f"{'id':>5} {'state':<10}{'prio':>5}{'tries':>6}  {'mode':<10}{'workload':<50}{'worker':<24}error")
+    for job in jobs:
+        print(f"{job['id']:>5} {job['state']:<10}{job['priority']:>5}{job['attempts']:>4}/{job['max_attempts']:<2} "
+              f"{job['mode']:<10}{job['workload']:<50}{job['worker'] or '':<24}{job['error'] or ''}")
+
+
+if __name__ == '__main__':
+    from config import parse_config
+    parser = argparse.ArgumentParser(description='Queue of workload tuning jobs')
+    parser.add_argument('--config', type=str, default='config/config.ini', help='configuration file')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='enqueue workloads')
+    add.add_argument('workloads', nargs='+', help='workload files')
+    add.add_argument('--mode', choices=['surrogate', 'real'], default='surrogate')
+    add.add_argument('--budget', type=int, default=None, help='evaluations per job, default the tuner default')
+    add.add_argument('--priority', type=int, default=0, help='higher runs first')
+    add.add_argument('--force', action='store_true', help='enqueue again even when the workload is already done')
+    show = commands.add_parser('list', help='show jobs')
+    show.add_argument('--state', choices=states, default=None)
+    priority = commands.add_parser('priority', help='change the priority of a job')
+    priority.add_argument('job_id', type=int)
+    priority.add_argument('priority', type=int)
+    for name, text in [('retry', 'put a failed or cancelled job back to pending'), ('cancel', 'cancel a pending job'),
+                       ('log', 'print the log of a job')]:
+        commands.add_parser(name, help=text).add_argument('job_id', type=int)
+    work = commands.add_parser('work', help='run jobs')
+    work.add_argument('--name', type=str, default=None, help='worker name, default host:pid')
+    work.add_argument('--once', action='store_true', help='exit when no pending or running jobs are left')
+    cmd = parser.parse_args()
+
+    args = parse_config.parse_args(cmd.config)
+    job_queue = queue_from_config(args)
+    if cmd.command == 'add':
+        for workload in cmd.workloads:
+            print(f"Job {job_queue.add(workload, cmd.mode, cmd.budget, cmd.priority, cmd.force)}: {workload}")
+    elif cmd.command == 'list':
+        print_jobs(job_queue.jobs(cmd.state))
+        print(job_queue.counts())
+    elif cmd.command == 'priority':
+        print(f"Updated {job_queue.set_priority(cmd.job_id, cmd.priority)} job")
+    elif cmd.command == 'retry':
+        print(f"Requeued {job_queue.retry(cmd.job_id)} job")
+    elif cmd.command == 'cancel':
+        print(f"Cancelled {job_queue.cancel(cmd.job_id)} job")
+    elif cmd.command == 'log':
+        job = job_queue.get(cmd.job_id)
+        if job and job['log_path'] and os.path.exists(job['log_path']):
+            with open(job['log_path']) as f:
+                print(f.read())
+        else:
+            print(f"No log for job {cmd.job_id}")
+    elif cmd.command == 'work':
+        run_worker(job_queue, args, cmd.name, cmd.once,
+                   float(args['benchmark_config'].get('job_poll_interval', 30)))
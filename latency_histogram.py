@@ -0,0 +1,116 @@
+class LatencyHistogram:
+    """
+    HDR-style latency histogram with bounded memory.
+    Latencies are stored in microseconds in log-linear buckets: values below
+    2**significant_bits are exact, larger values keep `significant_bits` bits of
+    precision (about 1.6% relative error for the default of 7).
+    Only buckets that were hit are stored, so memory never exceeds the bucket count.
+    """
+    def __init__(self, significant_bits=7, max_seconds=3600):
+        self.significant_bits = significant_bits
+        self.half = 1 << (significant_bits - 1)
+        self.max_value = int(max_seconds * 1e6)
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket_index(self, value):
+        if value < (self.half << 1):
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return (shift + 1) * self.half + (value >> shift) - self.half
+
+    def bucket_value(self, index):
+        # Midpoint of the value range covered by the bucket
+        if index < (self.half << 1):
+            return index
+        shift = index // self.half - 1
+        mantissa = index - shift * self.half
+        lower = mantissa << shift
+        upper = ((mantissa + 1) << shift) - 1
+        return (lower + upper) // 2
+
+    def record(self, seconds):
+        value = min(max(int(seconds * 1e6), 0), self.max_value)
+        index = self.bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, c in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + c
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        return self
+
+    def percentile(self, p):
+        """Latency in seconds at percentile p (0-100)"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                value = min(max(self.bucket_value(index), self.min), self.max)
+                return value / 1e6
+        return self.max / 1e6
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count / 1e6
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": (self.min or 0) / 1e6,
+            "max": (self.max or 0) / 1e6,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class TemplateLatency:
+    """Overall latency histogram plus one histogram per query template"""
+    def __init__(self):
+        self.overall = LatencyHistogram()
+        self.templates = {}
+        self.template_text = {}
+
+    def record(self, template_id, template, seconds):
+        self.overall.record(seconds)
+        if template_id not in self.templates:
+            self.templates[template_id] = LatencyHistogram()
+            self.template_text[template_id] = template
+        self.templates[template_id].record(seconds)
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        for template_id, hist in other.templates.items():
+            if template_id not in self.templates:
+                self.templates[template_id] = LatencyHistogram()
+                self.template_text[template_id] = other.template_text[template_id]
+            self.templates[template_id].merge(hist)
+        return self
+
+    def to_dict(self):
+        templates = {}
+        for template_id, hist in self.templates.items():
+            summary = hist.to_dict()
+            summary["template"] = self.template_text[template_id]
+            templates[template_id] = summary
+        return {"overall": self.overall.to_dict(), "templates": templates}
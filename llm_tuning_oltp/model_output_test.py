@@ -12,6 +12,7 @@ sys.path.insert(0, project_root)
 from knob_config.parse_knob_config import get_knobs
 from Database import Database
 from workload_executor import workload_executor
+from baseline_cache import BaselineCache
 import utils
 
 
@@ -98,6 +99,13 @@ def default_run(workload_file, db, executor):
         # remove auto_conf from the database
         db.remove_auto_conf() 
 
+        # reuse the baseline of an earlier session if workload, database and data are unchanged
+        baseline_cache = BaselineCache(db, executor.args)
+        baseline = baseline_cache.load(workload_file)
+        if baseline is not None:
+            print(f"-----------------Default QPS: {baseline['qps']}--------------------")
+            return baseline['qps']
+
         # reset inner metrics
         print("Resetting inner metrics...")
         db.reset_inner_metrics()
@@ -105,6 +113,7 @@ def default_run(workload_file, db, executor):
         # run the workload with default configuration
         qps = executor.run_config(config=None, workload_file=workload_file)
         print(f"Default configuration run complete for workload")
+        baseline_cache.save(workload_file, executor.qps)
         
         print(f"-----------------Default QPS: {qps}--------------------")
         return qps
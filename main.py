@@ -1,15 +1,22 @@
 from config import parse_config
+import argparse
 import os
-import subprocess
 import time
-from tune import tune
+from tune import batch_tune
+from job_queue import queue_from_config, run_worker
+
+def select_workloads(workloads, workload_range):
+    """workloads[start:end] for a workload_range of start:end (either side may be empty), all of them when empty"""
+    if not workload_range.strip():
+        return workloads
+    start, _, end = workload_range.partition(':')
+    return workloads[int(start) if start.strip() else None:int(end) if end.strip() else None]
 
-def recreate_database(database_name):
-    # Recover postgres and recreate database from template
-    subprocess.run(['bash', 'scripts/recover_postgres.sh'])
-    subprocess.run(['bash', 'scripts/copy_db_from_template.sh', database_name])
-    
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workload_range', type=str, default=None,
+                        help='start:end of the sorted workload list to tune, overrides [benchmark_config] workload_range')
+    cmd = parser.parse_args()
     # Load configuration file
     args = parse_config.parse_args("config/config.ini")
     print(args)
@@ -18,48 +25,39 @@ if __name__ == '__main__':
     workload_base_path = args['benchmark_config']['workload_path']
     workload_type = args['benchmark_config']['benchmark']
     benchmark_type = args['benchmark_config']['type']
-    
+
     all = os.listdir('./' + workload_base_path + '/')
-    
+
     # Filter based on benchmark type
     if benchmark_type == 'oltp':
         workloads = sorted([i for i in all if i.startswith(f'sample_{workload_type}_config') and i.endswith('.xml') and i != f'sample_{workload_type}_config.xml'])
     else:
         workloads = sorted([i for i in all if i.startswith(workload_type)])
+    workload_range = cmd.workload_range if cmd.workload_range is not None else args['benchmark_config'].get('workload_range', '')
+    workload_files = [os.path.join('./', workload_base_path, w) for w in select_workloads(workloads, workload_range)]
 
     # print start time in unix seconds
     print("Start time (unix seconds):", int(time.time()))
-    # for idx in range(4, 13):
-    #     print("Begin tuning for workload:", idx)
-    #     full_workload_path = os.path.join('./', workload_base_path, workloads[idx])
-    #     print(f'tune for workload: {full_workload_path}')
-    #     try:
-    #         # print the star time for each workload
-    #         print("Start time for workload (unix seconds):", int(time.time()))
-    #         recreate_database(args['database_config']['database'])
-    #         tune(workload_file=full_workload_path, args=args)
-    #         # print the end time for each workload
-    #         print("End time for workload (unix seconds):", int(time.time()))
-    #     except Exception as e:
-    #         print(f'occur {e}')
-    #         continue
-    # using the surrogate model to tune the remaining of the workloads
+    # using the surrogate model to tune the workloads
     use_surrogate = True
-    for idx in range(17, 100):
-        print("Begin tuning for workload with surrogate model:", idx)
-        full_workload_path = os.path.join('./', workload_base_path, workloads[idx])
-        print(f'tune for workload: {full_workload_path}')
-        try:
-            # print the star time for each workload
-            print("Start time for workload (unix seconds):", int(time.time()))
-            # recreate_database(args['database_config']['database'])
-            tune(workload_file=full_workload_path, args=args, use_surrogate=use_surrogate)
-            # print the end time for each workload
-            print("End time for workload (unix seconds):", int(time.time()))
-        except Exception as e:
-            print(f'occur {e}')
-            continue
+    if args['benchmark_config'].get('backend', 'postgres') == 'mock':
+        # the mock backend is cheap, run the full execution path instead of the surrogate
+        use_surrogate = False
+    if args['benchmark_config'].get('batch_tune', 'false').lower() == 'true':
+        # default runs spread over the database instances, surrogate optimizations in a process pool
+        workers = int(args['benchmark_config'].get('batch_workers', os.cpu_count() or 1))
+        results = batch_tune(workload_files, args, workers=workers)
+        failed = [w for w, result in results.items() if isinstance(result, Exception)]
+        print(f"Batch tuning complete: {len(results) - len(failed)} succeeded, {len(failed)} failed {failed}")
+    else:
+        # durable queue: failed workloads are retried, more workers can join with `python job_queue.py work`
+        job_queue = queue_from_config(args)
+        mode = 'surrogate' if use_surrogate else 'real'
+        for workload_file in workload_files:
+            job_queue.add(workload_file, mode)
+        print(f"Job queue {job_queue.path}: {job_queue.counts()}")
+        run_worker(job_queue, args, once=True, poll_interval=float(args['benchmark_config'].get('job_poll_interval', 30)))
+        print(f"Job queue {job_queue.path}: {job_queue.counts()}")
 
-    
     # print end time in unix seconds
-    print("End time (unix seconds):", int(time.time()))
\ No newline at end of file
+    print("End time (unix seconds):", int(time.time()))
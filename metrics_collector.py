@@ -0,0 +1,64 @@
+import json
+import os
+
+default_definitions = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'inner_metrics.json')
+
+
+class MetricsCollector:
+    """
+    Internal metrics described in a JSON file instead of code.
+
+    Every group is one stat view (the "from" clause, which may use %(database)s)
+    and maps metric names to aggregate SQL expressions, so each group yields one
+    row. All groups are fetched with a single CTE query; "derived" metrics are
+    scaled copies of fetched ones. Metrics keep the order of the definitions file.
+    """
+    def __init__(self, path=None):
+        self.path = path or default_definitions
+        with open(self.path, 'r') as f:
+            definitions = json.load(f)
+        self.groups = definitions['groups']
+        self.derived = definitions.get('derived', {})
+        self.names = [name for group in self.groups.values() for name in group['metrics']] + list(self.derived)
+
+    def group_query(self, group):
+        columns = ', '.join(f'{expr} AS "{name}"' for name, expr in self.groups[group]['metrics'].items())
+        return f"SELECT {columns} FROM {self.groups[group]['from']}"
+
+    def batch_query(self):
+        ctes = ',\n'.join(f'g_{group} AS ({self.group_query(group)})' for group in self.groups)
+        return f"WITH {ctes}\nSELECT * FROM {', '.join(f'g_{group}' for group in self.groups)};"
+
+    def fetch_row(self, cursor, query, params):
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        if row is None:
+            return {}
+        return {column[0]: float(value or 0) for column, value in zip(cursor.description, row)}
+
+    def collect(self, conn, params):
+        """
+        Fetch every metric in one round trip. If the batch fails, e.g. a view or
+        column missing on this PostgreSQL version, fall back to one query per
+        group so the groups that work are kept. Missing metrics are 0.0.
+        """
+        values = {}
+        cursor = conn.cursor()
+        try:
+            values = self.fetch_row(cursor, self.batch_query(), params)
+        except Exception as e:
+            print(f"Batched metrics query failed, collecting per group: {e}")
+            conn.rollback()
+            for group in self.groups:
+                try:
+                    values.update(self.fetch_row(cursor, self.group_query(group), params))
+                except Exception as group_error:
+                    print(f"Error fetching {group} metrics: {group_error}")
+                    conn.rollback()
+        finally:
+            cursor.close()
+
+        for name, spec in self.derived.items():
+            if spec['source'] in values:
+                values[name] = values[spec['source']] * spec.get('scale', 1)
+        return {name: values.get(name, 0.0) for name in self.names}
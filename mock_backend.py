@@ -0,0 +1,225 @@
+import math
+import os
+import time
+import zlib
+import numpy as np
+from knob_config.parse_knob_config import get_knobs
+from metrics_collector import MetricsCollector
+
+
+class StandInCursor:
+    """Answers the statements the harness issues with fixed, well-formed rows"""
+    def __init__(self, collector):
+        self.collector = collector
+        self.description = None
+        self.row = None
+
+    def execute(self, sql, params=None):
+        text = sql.lstrip()
+        if text.startswith('WITH g_') or text.startswith('SELECT') and ' AS "' in text:
+            names = [n for n in self.collector.names if f'"{n}"' in text]
+            self.description = [(n,) for n in names]
+            self.row = tuple(float(i + 1) for i in range(len(names)))
+        elif text.startswith('EXPLAIN'):
+            self.row = ([{'Plan': {'Node Type': 'Seq Scan', 'Total Cost': 1.0, 'Plan Rows': 1}}],)
+        else:
+            self.description = None
+            self.row = (None,)
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return [self.row]
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, collector):
+        self.collector = collector
+        self.autocommit = False
+
+    def cursor(self):
+        return StandInCursor(self.collector)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ResponseSurface:
+    """
+    Synthetic throughput over the knob space.
+    Every knob contributes a Gaussian bump around a random optimum, weighted by
+    its important_rank (or its position), plus one interaction between the two
+    most important knobs and multiplicative noise. Pushing the most important
+    knob into the top 2% of its range crashes the run (throughput 0), like an
+    unstartable configuration. Deterministic for a given seed.
+    """
+    def __init__(self, knobs, seed=0, base=1000.0, gain=2.0, noise=0.02):
+        rng = np.random.default_rng(seed)
+        self.knobs = knobs
+        self.base = base
+        self.gain = gain
+        self.noise = noise
+        self.noise_rng = np.random.default_rng(seed + 1)
+        ranked = sorted(knobs, key=lambda name: (knobs[name].get('important_rank', 1000), list(knobs).index(name)))
+        weights = np.array([1.0 / (1 + i) for i in range(len(ranked))])
+        self.weights = dict(zip(ranked, weights / weights.sum()))
+        self.centers = dict(zip(ranked, rng.uniform(0.1, 0.9, len(ranked))))
+        self.widths = dict(zip(ranked, rng.uniform(0.1, 0.4, len(ranked))))
+        self.ranked = ranked
+
+    def normalize(self, name, value):
+        detail = self.knobs[name]
+        span = detail['max'] - detail['min']
+        if span <= 0:
+            return 0.5
+        return min(1.0, max(0.0, (float(value) - detail['min']) / span))
+
+    def throughput(self, config):
+        x = {name: self.normalize(name, config.get(name, self.knobs[name]['default'])) for name in self.ranked}
+        if self.ranked and x[self.ranked[0]] > 0.98:
+            return 0.0
+        score = sum(self.weights[n] * math.exp(-(x[n] - self.centers[n]) ** 2 / (2 * self.widths[n] ** 2))
+                    for n in self.ranked)
+        if len(self.ranked) > 1:
+            a, b = self.ranked[0], self.ranked[1]
+            score += 0.1 * (x[a] - self.centers[a]) * (x[b] - self.centers[b])
+        qps = self.base * (1 + self.gain * score)
+        return max(0.0, qps * (1 + self.noise * self.noise_rng.standard_normal()))
+
+
+def workload_seed(workload_file):
+    return zlib.crc32(str(workload_file).encode())
+
+
+class MockDatabase:
+    """
+    In-process stand-in for Database with the same public methods.
+    Knob changes are kept in memory, restarts cost restart_latency seconds and
+    the inner metrics are derived from the throughput of the last mock run.
+    """
+    def __init__(self, config, path):
+        self.host = config['database_config'].get('host', 'localhost')
+        self.port = int(config['database_config'].get('port', 5432))
+        self.database = config['database_config'].get('database', 'mock')
+        self.knobs = get_knobs(path)
+        self.restart_latency = float(config.get('benchmark_config', {}).get('mock_restart_latency', 0))
+        self.metrics = MetricsCollector(config['database_config'].get('inner_metrics_config'))
+        self.applied = {}
+        self.last_throughput = 0.0
+        self.restarts = 0
+
+    def get_conn(self, max_retries=3):
+        return StandInConnection(self.metrics)
+
+    def fetch_knob(self):
+        return {name: float(self.applied.get(name, detail['default'])) for name, detail in self.knobs.items()}
+
+    def current_knobs(self):
+        return self.fetch_knob()
+
+    def extract_query_plans(self, workload_queries):
+        return [{'Plan': {'Node Type': 'Seq Scan', 'Total Cost': 1.0, 'Plan Rows': 1}, 'query': q.strip(), 'query_id': i}
+                for i, q in enumerate(workload_queries)]
+
+    def save_workload_plans(self, workload_queries, workload_name):
+        return self.extract_query_plans(workload_queries)
+
+    def reset_inner_metrics(self):
+        self.last_throughput = 0.0
+
+    def fetch_inner_metrics(self):
+        """Counters proportional to the last run's throughput, in MetricsCollector order"""
+        qps = self.last_throughput
+        metrics = {name: float(qps * (i + 1)) for i, name in enumerate(self.metrics.names)}
+        for name, spec in self.metrics.derived.items():
+            metrics[name] = metrics.get(spec['source'], 0.0) * spec.get('scale', 1)
+        return metrics
+
+    def change_knob(self, knobs):
+        self.applied.update(knobs)
+        return self.restart_db()
+
+    def restart_db(self):
+        if self.restart_latency:
+            time.sleep(self.restart_latency)
+        self.restarts += 1
+        return True
+
+    def remove_auto_conf(self):
+        self.applied = {}
+
+    def get_all_pg_knobs(self):
+        return dict(self.knobs)
+
+    def fetch_hot_relations(self, limit=50):
+        return []
+
+    def prewarm_relations(self, relations, threads=4):
+        return 0.0, 0
+
+    def fetch_baseline_signature(self, template):
+        return {'server_version': 'mock', 'template': {'name': template, 'oid': 0}}
+
+    def recreate_from_template(self):
+        return True
+
+
+class MockBenchmark:
+    """
+    Stand-in for BenchBase and the DWG drivers: throughput from a
+    ResponseSurface per workload, run_latency seconds per run.
+    """
+    def __init__(self, db, benchmark_config):
+        self.db = db
+        self.run_latency = float(benchmark_config.get('mock_run_latency', 0))
+        self.noise = float(benchmark_config.get('mock_noise', 0.02))
+        self.terminals = int(benchmark_config.get('benchbase_terminals', benchmark_config.get('thread', 16)))
+        # nominal run length, bounds the latency reported for a crashed run
+        self.run_seconds = float(benchmark_config.get('benchbase_time', 60))
+        self.surfaces = {}
+
+    def run(self, workload_file):
+        """Throughput and an overall latency summary for the knobs currently applied to db"""
+        surface = self.surfaces.get(workload_file)
+        if surface is None:
+            surface = ResponseSurface(self.db.knobs, seed=workload_seed(workload_file), noise=self.noise)
+            self.surfaces[workload_file] = surface
+        if self.run_latency:
+            time.sleep(self.run_latency)
+        qps = surface.throughput(self.db.current_knobs())
+        self.db.last_throughput = qps
+        # closed-loop clients: mean latency = terminals / throughput; a crashed run
+        # completes nothing, charge every client the whole run
+        mean = self.terminals / qps if qps else self.run_seconds * self.terminals
+        overall = {'count': int(qps), 'mean': mean, 'min': mean * 0.2, 'max': mean * 8,
+                   'p50': mean * 0.8, 'p95': mean * 2.5, 'p99': mean * 4}
+        return qps, {'overall': overall, 'templates': {}}
+
+
+def output_path(config, path):
+    """
+    path moved under mock_output_root (default mock_output/) when backend = mock, so
+    simulated runs never mix with the samples, metrics, runhistories and models of real ones
+    """
+    benchmark_config = config.get('benchmark_config', {})
+    if benchmark_config.get('backend', 'postgres').lower() != 'mock':
+        return path
+    return os.path.normpath(os.path.join(benchmark_config.get('mock_output_root', 'mock_output'), path))
+
+
+def create_database(config, path):
+    """Database for the configured backend: postgres (default) or mock"""
+    if config.get('benchmark_config', {}).get('backend', 'postgres').lower() == 'mock':
+        return MockDatabase(config, path)
+    import Database
+    return Database.Database(config=config, path=path)
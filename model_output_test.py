@@ -6,6 +6,7 @@ from config import parse_config
 import os
 from Database import Database
 from workload_executor import workload_executor
+from baseline_cache import BaselineCache
 import utils
 
 label_mapper_s1 = {
@@ -75,6 +76,13 @@ def default_run(workload_file, db, executor):
         # remove auto_conf from the database
         db.remove_auto_conf() 
 
+        # reuse the baseline of an earlier session if workload, database and data are unchanged
+        baseline_cache = BaselineCache(db, executor.args)
+        baseline = baseline_cache.load(workload_file)
+        if baseline is not None:
+            print(f"-----------------Default QPS: {baseline['value']}--------------------")
+            return baseline['value']
+
         # reset inner metrics
         print("Resetting inner metrics...")
         db.reset_inner_metrics()
@@ -82,6 +90,7 @@ def default_run(workload_file, db, executor):
         # run the workload with default configuration
         qps = executor.run_config(config=None, workload_file=workload_file)
         print(f"Default configuration run complete for workload")
+        baseline_cache.save(workload_file, executor.qps, qps)
         
         print(f"-----------------Default QPS: {qps}--------------------")
         return qps
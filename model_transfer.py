@@ -0,0 +1,222 @@
+import argparse
+import glob
+import json
+import os
+import numpy as np
+from baseline_cache import metrics_path, oltp_benchmarks
+from knob_config import parse_knob_config
+
+
+def newest_runhistory(output_dir):
+    runs = sorted(glob.glob(os.path.join(output_dir, 'run_*', 'runhistory.json')), key=os.path.getmtime)
+    return runs[-1] if runs else None
+
+
+def read_runhistory(path):
+    """(configs, qps) of the successful runs of a SMAC runhistory, cost is negative QPS"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    configs, qps = [], []
+    for run_key, run_value in data['data']:
+        config = data['configs'].get(str(run_key[0]))
+        status = run_value[2].get('__enum__', '') if isinstance(run_value[2], dict) else str(run_value[2])
+        if config is None or 'SUCCESS' not in status:
+            continue
+        configs.append(config)
+        qps.append(-run_value[0])
+    return configs, np.array(qps, dtype=np.float64)
+
+
+def metrics_vector(internal_metrics):
+    values = internal_metrics.values() if isinstance(internal_metrics, dict) else internal_metrics
+    return np.log1p(np.maximum(np.array(list(values), dtype=np.float64), 0))
+
+
+class PriorTask:
+    """
+    A finished tuning session of one workload: its runhistory, default-run
+    internal metrics and a random forest of normalized knobs -> standardized QPS.
+    """
+    def __init__(self, workload, configs, qps, internal_metrics, knobs):
+        self.workload = workload
+        self.configs = configs
+        self.knobs = knobs
+        self.x = normalize_configs(configs, knobs)
+        self.y = (qps - qps.mean()) / (qps.std() or 1.0)
+        self.metrics = metrics_vector(internal_metrics)
+        self.model = None
+
+    def fit(self):
+        from sklearn.ensemble import RandomForestRegressor
+        self.model = RandomForestRegressor(n_estimators=50, min_samples_leaf=2, random_state=0)
+        self.model.fit(self.x, self.y)
+        return self
+
+    def predict(self, x):
+        if self.model is None:
+            self.fit()
+        return self.model.predict(x)
+
+    def best_configs(self, n):
+        return [self.configs[i] for i in np.argsort(-self.y)[:n]]
+
+
+def feature_names(knobs):
+    # knobs with a non-empty range, in ConfigSpace order
+    return [name for name in sorted(knobs) if knobs[name]['max'] != knobs[name]['min']]
+
+
+def normalize_configs(configs, knobs):
+    names = feature_names(knobs)
+    low = np.array([knobs[n]['min'] for n in names], dtype=np.float64)
+    span = np.array([knobs[n]['max'] - knobs[n]['min'] for n in names], dtype=np.float64)
+    values = np.array([[float(config.get(n, knobs[n]['default'])) for n in names] for config in configs],
+                      dtype=np.float64).reshape(len(configs), len(names))
+    return np.clip((values - low) / span, 0.0, 1.0)
+
+
+def load_priors(benchmark_name, knobs, exclude=None, max_tasks=0, root='.'):
+    """
+    PriorTask for every <benchmark>/<workload>_smac_output whose runhistory and
+    default-run internal metrics exist, except the workload exclude
+    (a save_workload identifier). max_tasks keeps only the most recent ones.
+    root is the output root the sessions wrote to, mock_output_root for the mock backend.
+    """
+    priors = []
+    benchmark_dir = os.path.join(root, benchmark_name)
+    output_dirs = sorted(glob.glob(os.path.join(benchmark_dir, '**', '*_smac_output'), recursive=True), key=os.path.getmtime)
+    for output_dir in reversed(output_dirs):
+        save_workload = os.path.relpath(output_dir, benchmark_dir)[:-len('_smac_output')]
+        # OLAP identifiers keep the workload path, e.g. ./olap_workloads/tpch_1
+        if exclude is not None and os.path.normpath(save_workload) == os.path.normpath(exclude):
+            continue
+        runhistory = newest_runhistory(output_dir)
+        extension = '.xml' if benchmark_name in oltp_benchmarks else '.wg'
+        metrics_file = os.path.normpath(os.path.join(root, metrics_path(save_workload + extension, benchmark_name)))
+        if runhistory is None or not os.path.exists(metrics_file):
+            continue
+        try:
+            configs, qps = read_runhistory(runhistory)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping unreadable runhistory {runhistory}: {e}")
+            continue
+        if len(configs) < 5:
+            continue
+        with open(metrics_file, 'r') as f:
+            internal_metrics = json.load(f)
+        priors.append(PriorTask(save_workload, configs, qps, internal_metrics, knobs))
+        if max_tasks and len(priors) >= max_tasks:
+            break
+    return priors
+
+
+def metric_weights(priors, internal_metrics):
+    """Weights from the distance between default-run internal metrics, standardized per metric"""
+    target = metrics_vector(internal_metrics)
+    matrix = np.array([p.metrics for p in priors if len(p.metrics) == len(target)] + [target])
+    if len(matrix) < 2:
+        return np.full(len(priors), 1.0 / max(1, len(priors)))
+    scale = matrix.std(axis=0)
+    scale[scale == 0] = 1.0
+    distances = np.array([np.linalg.norm((p.metrics - target) / scale) if len(p.metrics) == len(target) else np.inf
+                          for p in priors])
+    bandwidth = np.median(distances[np.isfinite(distances)]) or 1.0
+    weights = np.exp(-distances ** 2 / (2 * bandwidth ** 2))
+    return weights / weights.sum()
+
+
+def ranking_loss(predicted, observed):
+    """Number of misordered pairs"""
+    return int(np.sum((predicted[:, None] < predicted[None, :]) != (observed[:, None] < observed[None, :])))
+
+
+def rgpe_weights(priors, x, y, samples=100, seed=0):
+    """
+    RGPE weights (Feurer et al.): the share of bootstrap samples of the target
+    observations on which each prior model has the lowest ranking loss, ties
+    split evenly.
+    """
+    rng = np.random.default_rng(seed)
+    predictions = [p.predict(x) for p in priors]
+    wins = np.zeros(len(priors))
+    for _ in range(samples):
+        sample = rng.integers(len(y), size=len(y))
+        losses = np.array([ranking_loss(predicted[sample], y[sample]) for predicted in predictions])
+        best = np.flatnonzero(losses == losses.min())
+        wins[best] += 1.0 / len(best)
+    return wins / samples
+
+
+def similarity_weights(priors, internal_metrics, target_configs=None, target_qps=None, knobs=None):
+    """RGPE weights when the target has at least 3 observations, else internal-metric similarity"""
+    if target_configs is not None and len(target_configs) >= 3:
+        return rgpe_weights(priors, normalize_configs(target_configs, knobs), np.asarray(target_qps, dtype=np.float64))
+    return metric_weights(priors, internal_metrics)
+
+
+def warm_start_configs(priors, weights, knobs, n=10, per_task=10):
+    """
+    Initial design for a new session: the best configurations of the weighted
+    prior tasks, ranked by the weighted ensemble of the prior models.
+    """
+    candidates = []
+    for prior, weight in zip(priors, weights):
+        if weight > 0:
+            candidates.extend(prior.best_configs(per_task))
+    if not candidates:
+        return []
+    x = normalize_configs(candidates, knobs)
+    score = sum(weight * prior.predict(x) for prior, weight in zip(priors, weights) if weight > 0)
+    chosen, seen = [], set()
+    for i in np.argsort(-score):
+        config = clip_config(candidates[i], knobs)
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            chosen.append(config)
+        if len(chosen) >= n:
+            break
+    return chosen
+
+
+def clip_config(config, knobs):
+    """Config restricted to the current knobs and their ranges, missing knobs at their default"""
+    clipped = {}
+    for name, detail in knobs.items():
+        value = config.get(name, detail['default'])
+        value = min(max(value, detail['min']), detail['max'])
+        clipped[name] = int(round(value)) if detail['type'] == 'integer' else float(value)
+    return clipped
+
+
+def transfer_design(benchmark_name, knobs, save_workload, internal_metrics, n=10, max_tasks=0, root='.'):
+    """Warm-start configurations for save_workload, with the prior workloads and weights used"""
+    priors = load_priors(benchmark_name, knobs, exclude=save_workload, max_tasks=max_tasks, root=root)
+    if not priors:
+        return [], []
+    target_configs, target_qps = None, None
+    target_runhistory = newest_runhistory(os.path.join(root, benchmark_name, f"{save_workload}_smac_output"))
+    if target_runhistory is not None:
+        # an earlier session of this workload: rank the prior models on its observations
+        target_configs, target_qps = read_runhistory(target_runhistory)
+    weights = similarity_weights(priors, internal_metrics, target_configs, target_qps, knobs)
+    ranked = sorted(zip([p.workload for p in priors], weights), key=lambda item: -item[1])
+    return warm_start_configs(priors, weights, knobs, n), ranked
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show the warm-start design transferred from earlier sessions')
+    parser.add_argument('--benchmark', type=str, required=True, help='benchmark directory, e.g. smallbank')
+    parser.add_argument('--workload', type=str, required=True, help='save_workload identifier of the target')
+    parser.add_argument('--knob_config', type=str, default='knob_config/knob_config_pg14.json')
+    parser.add_argument('-n', type=int, default=10, help='number of configurations')
+    parser.add_argument('--max_tasks', type=int, default=0, help='most recent prior sessions to use, 0 for all')
+    args = parser.parse_args()
+    knobs = parse_knob_config.get_knobs(args.knob_config)
+    extension = '.xml' if args.benchmark in oltp_benchmarks else '.wg'
+    with open(metrics_path(args.workload + extension, args.benchmark), 'r') as f:
+        internal_metrics = json.load(f)
+    configs, ranked = transfer_design(args.benchmark, knobs, args.workload, internal_metrics, args.n, args.max_tasks)
+    for workload, weight in ranked[:10]:
+        print(f"{workload:<50}{weight:.3f}")
+    print(json.dumps(configs[:3], indent=4))
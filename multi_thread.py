@@ -2,7 +2,14 @@ from datetime import datetime
 import threading
 import psycopg2
 import time
-import re
+from event_recorder import EventRecorder, write_run_report
+from instrumentation import span
+from latency_histogram import TemplateLatency
+from sql_template import PreparedStatements, fingerprint, template_id
+from workload_parser import load_workload
+
+# statements per workload run, larger workloads are truncated
+max_sql_num = 3000
 
 class key:
     def __init__(self, value, type):
@@ -25,8 +32,36 @@ def connect_og(database_name, user_name, password, host, port):
     cur = connection.cursor()
     return connection, cur
 
+def unfinished_penalty(statement_timeout, run_budget, timeout_penalty, total_sql, total_time, workers):
+    """
+    (seconds charged per failed, timed-out or skipped statement, cap on the total).
+    With a statement_timeout (ms) each one costs timeout_penalty times the limit.
+    Otherwise it costs timeout_penalty times the mean time of a completed
+    statement, capped at timeout_penalty times run_budget so configurations
+    that miss the budget keep their ranking.
+    """
+    if statement_timeout > 0:
+        return timeout_penalty * statement_timeout / 1000.0, 0.0
+    mean_latency = total_time * max(workers, 1) / total_sql if total_sql else 0.0
+    return timeout_penalty * mean_latency, timeout_penalty * run_budget
+
+def penalized_performance(total_sql, unfinished, total_time, workers, penalty_latency, penalty_cap=0.0):
+    """
+    [-avg_time, qps] where every failed, timed-out or skipped statement adds
+    penalty_latency seconds of work spread across the workers, at most
+    penalty_cap seconds in total when set
+    """
+    penalty = unfinished * penalty_latency / max(workers, 1)
+    if penalty_cap > 0:
+        penalty = min(penalty, penalty_cap)
+    effective_time = total_time + penalty
+    if total_sql == 0 or effective_time == 0:
+        return [0.0, 0.0]
+    return [-effective_time / total_sql, total_sql / effective_time]
+
 class one_thread_given_queries(threading.Thread):
-    def __init__(self, wg, log_path, connection, cur, thread_id, time_stamp) -> None:
+    def __init__(self, wg, log_path, connection, cur, thread_id, time_stamp, prepared=False,
+                 stop=None, penalty_latency=0.0) -> None:
         threading.Thread.__init__(self)
         self.wg = wg
         self.log_path = log_path
@@ -34,37 +69,85 @@ class one_thread_given_queries(threading.Thread):
         self.cur = cur
         self.thread_id = thread_id
         self.time_stamp = time_stamp
+        self.latency = TemplateLatency()
+        self.recorder = EventRecorder(thread_id)
+        self.prepared = PreparedStatements() if prepared else None
+        # set once the run budget is exhausted, in-flight statements are cancelled
+        self.stop = stop
+        self.penalty_latency = penalty_latency
 
     def run(self):
-        try:
-            sql_list = self.wg
-            with open(self.log_path, 'w') as f:
-                print(f"Thread {self.thread_id} log file start. Tot sql num : {len(sql_list)}")
-                f.write(f"Thread {self.thread_id} log file start. Tot sql num : {len(sql_list)}\n")
-                start_time = time.time()
-                for i, it in enumerate(sql_list):
-                    # print(it)
-                    error_info = it
+        # No stdio or file I/O in the loop, events are buffered and reported after join
+        sql_list = self.wg
+        start_time = time.time()
+        for i, it in enumerate(sql_list):
+            if self.stop is not None and self.stop.is_set():
+                self.skip_remaining(i)
+                break
+            query_start = time.perf_counter()
+            try:
+                if self.prepared is None:
                     self.cur.execute(it)
-                    self.connection.commit()
-                    # print(f"Thread {self.thread_id} sql id {i}")
-                    # if i % 200 == 0:
-                    f.write(f"Thread {self.thread_id} {i} sqls has been processed successfully.\n")
-                    print(f"Thread {self.thread_id} {i} sqls has been processed successfully.\n")
-                    end_time = time.time()
-                    elapsed_time = end_time - start_time
-                    f.write(f"Thread {self.thread_id} processed time: {elapsed_time} seconds.\n")
-                    print(f"Thread {self.thread_id} processed time: {elapsed_time} seconds.\n")
-
-                end_time = time.time()
-                self.time_stamp[self.thread_id] = key(len(sql_list), end_time - start_time)
-
-        except Exception as e:
-            print("Error: ", e)
-            print('error_info:', error_info)
+                else:
+                    self.execute_prepared(it)
+                self.connection.commit()
+            except psycopg2.extensions.QueryCanceledError:
+                self.connection.rollback()
+                if self.stop is not None and self.stop.is_set():
+                    self.skip_remaining(i)
+                    break
+                # statement_timeout hit, count it with the penalty latency instead of waiting
+                self.recorder.timeout(i, time.perf_counter() - query_start)
+                template = fingerprint(it)
+                self.latency.record(template_id(template), template, self.penalty_latency)
+                continue
+            except Exception as e:
+                # same as the async driver: record the failure and go on with the next statement
+                try:
+                    self.connection.rollback()
+                except Exception:
+                    pass
+                self.recorder.error(i, it, e)
+                continue
+            latency = time.perf_counter() - query_start
+            template = fingerprint(it)
+            self.latency.record(template_id(template), template, latency)
+            self.recorder.sql(i, latency)
+
+        self.recorder.finish()
+        self.time_stamp[self.thread_id] = key(self.recorder.processed, time.time() - start_time)
+
+    def skip_remaining(self, index):
+        self.recorder.skip(index, len(self.wg) - index)
+        for it in self.wg[index:]:
+            template = fingerprint(it)
+            self.latency.record(template_id(template), template, self.penalty_latency)
+
+    def execute_prepared(self, sql):
+        prepare_sql, execute_sql, template = self.prepared.plan(sql)
+        if prepare_sql is not None:
+            try:
+                self.cur.execute(prepare_sql)
+                self.prepared.prepared(template, prepare_sql)
+            except Exception:
+                # the planner could not infer parameter types, run this template as plain text
+                self.connection.rollback()
+                self.prepared.fail(template)
+                execute_sql = sql
+        try:
+            self.cur.execute(execute_sql)
+        except psycopg2.extensions.QueryCanceledError:
+            raise
+        except Exception:
+            if execute_sql == sql:
+                raise
+            self.connection.rollback()
+            self.prepared.fail(template)
+            self.cur.execute(sql)
 
 class multi_thread:
-    def __init__(self, db, workload_path, thread_num, log_path):
+    def __init__(self, db, workload_path, thread_num, log_path, prepared=False,
+                 statement_timeout=0, run_budget=0, timeout_penalty=2.0):
         self.wg_file = None
         self.id = generate_random_string(10)
         self.workload_name = workload_path
@@ -75,7 +158,18 @@ class multi_thread:
         self.wg_path = workload_path
         self.log_path = log_path
         self.sql_list_idx = dict()
+        self.latency = None
+        # PREPARE each query template once per connection and EXECUTE it with the literals
+        self.prepared = prepared
+        # statement_timeout in ms and run_budget in seconds, 0 disables them
+        self.statement_timeout = int(statement_timeout)
+        self.run_budget = float(run_budget)
+        # latency recorded for timed-out and skipped statements: timeout_penalty times the limit
+        self.timeout_penalty = float(timeout_penalty)
+        limit = self.statement_timeout / 1000.0 if self.statement_timeout > 0 else self.run_budget
+        self.penalty_latency = float(timeout_penalty) * limit
 
+    @span('dwg.load')
     def data_pre(self):
         connection, cur = connect_og(
             database_name=self.db.database,
@@ -87,18 +181,7 @@ class multi_thread:
 
         connection.close()
 
-        with open(self.wg_path, 'r') as f:
-            self.wg_file = f.read()
-
-        sql_list = re.split(r'[;\n]+', self.wg_file)
-        for i, it in enumerate(sql_list):
-            sql_list[i] += ";"
-
-        if sql_list[-1] == ";":
-            sql_list = sql_list[0:-1]
-
-        if len(sql_list) > 3000:
-            sql_list = sql_list[:3000]
+        sql_list = list(load_workload(self.wg_path)[:max_sql_num])
 
         self.sql_list_idx = dict()
 
@@ -108,43 +191,92 @@ class multi_thread:
         for i in range(len(sql_list)):
             self.sql_list_idx[i % self.thread_num].append(sql_list[i])
 
+    @span('dwg.run')
     def run(self):
-        connection, cur = connect_og(
-            database_name=self.db.database,
-            user_name=self.db.user,
-            password=self.db.password,
-            host=self.db.host,
-            port=self.db.port
-        )
         threads = []
+        connections = []
         time_stamp = dict()
+        stop = threading.Event()
 
+        # one connection per thread, a shared psycopg2 connection serializes every statement
         for i in range(self.thread_num):
+            connection, cur = connect_og(
+                database_name=self.db.database,
+                user_name=self.db.user,
+                password=self.db.password,
+                host=self.db.host,
+                port=self.db.port
+            )
+            if self.statement_timeout > 0:
+                cur.execute("SET statement_timeout = %s;", (self.statement_timeout,))
+                connection.commit()
+            connections.append(connection)
             thread = one_thread_given_queries(
                 wg=self.sql_list_idx[i],
                 log_path=self.log_path,
                 connection=connection,
                 cur=cur,
                 thread_id=i,
-                time_stamp=time_stamp
+                time_stamp=time_stamp,
+                prepared=self.prepared,
+                stop=stop,
+                penalty_latency=self.penalty_latency
             )
             threads.append(thread)
 
+        def exhaust_budget():
+            print(f"Run budget of {self.run_budget} seconds exhausted, cancelling remaining queries")
+            stop.set()
+            for connection in connections:
+                connection.cancel()
+
+        timer = None
+        if self.run_budget > 0:
+            timer = threading.Timer(self.run_budget, exhaust_budget)
+            timer.daemon = True
+
         start_time = time.time()
+        if timer is not None:
+            timer.start()
         for it in threads:
             it.start()
         for it in threads:
             it.join()
         end_time = time.time()
+        if timer is not None:
+            timer.cancel()
+
+        self.latency = TemplateLatency()
+        for it in threads:
+            self.latency.merge(it.latency)
+        total_time = end_time - start_time
+        total_sql = sum(time_stamp[i].value for i in range(self.thread_num))
+        unfinished = sum(it.recorder.unfinished() for it in threads)
+
+        for connection in connections:
+            connection.close()
+        write_run_report(self.log_path, {
+            "workload": self.wg_path,
+            "driver": "thread",
+            "prepared": self.prepared,
+            "workers": self.thread_num,
+            "total_sql": total_sql,
+            "failed_sql": sum(it.recorder.failed for it in threads),
+            "timed_out_sql": sum(it.recorder.timed_out for it in threads),
+            "skipped_sql": sum(it.recorder.skipped for it in threads),
+            "budget_exhausted": stop.is_set(),
+            "statement_timeout": self.statement_timeout,
+            "run_budget": self.run_budget,
+            "total_time": total_time,
+            "latency": self.latency.to_dict(),
+        }, [it.recorder for it in threads])
+        for it in threads:
+            print(f"Thread {it.thread_id} processed {it.recorder.processed} sqls in {it.recorder.elapsed:.2f} seconds, "
+                  f"{it.recorder.failed} failed, {it.recorder.timed_out} timed out, {it.recorder.skipped} skipped")
+        print('length of sql list: ', total_sql)
+        print('total time: ', total_time)
+        print('latency: ', self.latency.overall.to_dict())
+        penalty = unfinished_penalty(self.statement_timeout, self.run_budget, self.timeout_penalty,
+                                     total_sql, total_time, self.thread_num)
+        return penalized_performance(total_sql, unfinished, total_time, self.thread_num, *penalty)
 
-        with open(self.log_path, 'w') as f:
-            f.write(f"total sql num : {len(self.wg_file)}\n")
-            f.write(f"total time consumed : {end_time - start_time}\n")
-            for i in range(self.thread_num):
-                f.write(f"\tthread {i} processed sql num : {time_stamp[i].value}\n")
-                f.write(f"\tthread {i} using time : {time_stamp[i].type}\n")
-        connection.close()
-        print('length of sql list: ',len(self.sql_list_idx[0]))
-        print('total time: ',end_time - start_time)
-        return [ -(end_time - start_time) / (len(self.sql_list_idx[0]) * self.thread_num),\
-                len(self.sql_list_idx[0]) / (end_time - start_time) * self.thread_num]    
\ No newline at end of file
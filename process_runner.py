@@ -0,0 +1,118 @@
+import collections
+import os
+import signal
+import subprocess
+import threading
+import time
+
+
+class ManagedProcess:
+    """
+    Non-blocking subprocess with streamed stdout/stderr capture, a timeout and cancellation.
+    Output lines are appended to log_path as they arrive and the last lines of
+    each stream are kept in memory for error reporting.
+    """
+    def __init__(self, command, cwd=None, env=None, log_path=None, timeout=None, tail_lines=200):
+        self.command = command
+        self.cwd = cwd
+        self.env = env
+        self.log_path = log_path
+        self.timeout = timeout
+        self.stdout_tail = collections.deque(maxlen=tail_lines)
+        self.stderr_tail = collections.deque(maxlen=tail_lines)
+        self.process = None
+        self.returncode = None
+        self.timed_out = False
+        self.cancelled = False
+        self.start_time = None
+        self.end_time = None
+        self._readers = []
+        self._timer = None
+        self._log = None
+        self._log_lock = threading.Lock()
+        self._line_handlers = []
+
+    def on_line(self, handler):
+        """Register handler(stream_name, line) called from the reader threads"""
+        self._line_handlers.append(handler)
+
+    def start(self):
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            self._log = open(self.log_path, 'a')
+        self.start_time = time.time()
+        # own process group so cancel() also stops children (e.g. the JVM behind a shell)
+        self.process = subprocess.Popen(self.command, cwd=self.cwd, env=self.env,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        text=True, bufsize=1, start_new_session=True)
+        for name, stream, tail in (('stdout', self.process.stdout, self.stdout_tail),
+                                   ('stderr', self.process.stderr, self.stderr_tail)):
+            reader = threading.Thread(target=self._read, args=(name, stream, tail), daemon=True)
+            reader.start()
+            self._readers.append(reader)
+        if self.timeout:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def _read(self, name, stream, tail):
+        for line in stream:
+            tail.append(line.rstrip('\n'))
+            for handler in self._line_handlers:
+                handler(name, line)
+            if self._log is not None:
+                with self._log_lock:
+                    self._log.write(line if name == 'stdout' else f"[stderr] {line}")
+                    self._log.flush()
+        stream.close()
+
+    def _expire(self):
+        if self.poll() is None:
+            print(f"Process exceeded timeout of {self.timeout} seconds, cancelling: {self.command[0]}")
+            self.timed_out = True
+            self.cancel()
+
+    def write(self, text):
+        """Send text to the process stdin"""
+        self.process.stdin.write(text)
+        self.process.stdin.flush()
+
+    def poll(self):
+        if self.process is None:
+            return None
+        return self.process.poll()
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def cancel(self, grace=10):
+        """SIGTERM the process group, SIGKILL it if it is still alive after grace seconds"""
+        if not self.running():
+            return
+        self.cancelled = True
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait(timeout=grace)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def wait(self, timeout=None):
+        """Block until the process exits, returns its exit code"""
+        self.returncode = self.process.wait(timeout=timeout)
+        for reader in self._readers:
+            reader.join()
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.end_time = time.time()
+        return self.returncode
+
+    def elapsed(self):
+        end = self.end_time or time.time()
+        return end - self.start_time if self.start_time else 0.0
@@ -0,0 +1,129 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from workload_parser import file_digest
+
+# benchmark settings that change what a run measures, part of every cache key
+run_settings = [
+    'tool', 'benchmark', 'benchbase_time', 'benchbase_terminals', 'thread', 'driver', 'sessions',
+    'prepared', 'statement_timeout', 'run_budget', 'timeout_penalty', 'steady_state', 'prewarm',
+    # a mock result must never answer a real run
+    'backend', 'mock_restart_latency', 'mock_run_latency', 'mock_noise',
+]
+
+
+def knob_vector(config, knobs):
+    """
+    Knob values in a canonical form: integer knobs snapped to their step from
+    min, floats rounded to 6 significant digits (float steps in the knob
+    configs are tuning hints, too coarse to identify a configuration).
+    """
+    vector = {}
+    for name in sorted(config):
+        value = config[name]
+        detail = knobs.get(name, {})
+        if detail.get('type') == 'integer':
+            step = detail.get('step') or 1
+            low = detail.get('min', 0)
+            value = int(round((float(value) - low) / step) * step + low)
+        elif isinstance(value, float):
+            value = float(f'{value:.6g}')
+        vector[name] = value
+    return vector
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache of evaluation results keyed by
+    (workload content hash, database and scale, run settings, canonical knob vector).
+    Entries older than ttl seconds are ignored and removed, ttl 0 never expires.
+    """
+    def __init__(self, path='smac_his/result_cache.db', ttl=0):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    workload TEXT,
+                    workload_hash TEXT,
+                    database TEXT,
+                    config TEXT,
+                    qps REAL,
+                    latency TEXT,
+                    created REAL
+                )""")
+
+    @contextlib.contextmanager
+    def connect(self):
+        """Connection committed on success and always closed, sqlite3's own context manager leaves it open"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def make_key(self, workload_file, database, benchmark_config, config, knobs):
+        workload_hash = file_digest(workload_file)
+        settings = {name: benchmark_config.get(name) for name in run_settings}
+        vector = knob_vector(config, knobs)
+        payload = json.dumps([workload_hash, database, settings, vector], sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest(), workload_hash, vector
+
+    def get(self, key):
+        with self.lock, self.connect() as conn:
+            row = conn.execute("SELECT qps, latency, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl and time.time() - row[2] > self.ttl:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+        return {'qps': row[0], 'latency': json.loads(row[1]) if row[1] else None, 'age': time.time() - row[2]}
+
+    def put(self, key, workload_file, workload_hash, database, vector, qps, latency=None):
+        with self.lock, self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, workload_file, workload_hash, database, json.dumps(vector), qps,
+                          json.dumps(latency) if latency is not None else None, time.time()))
+
+    def invalidate(self, workload_file=None, database=None, older_than=None):
+        """Delete entries matching every given filter, no filter clears the cache. Returns the count."""
+        clauses, params = [], []
+        if workload_file is not None:
+            clauses.append("workload = ?")
+            params.append(workload_file)
+        if database is not None:
+            clauses.append("database = ?")
+            params.append(database)
+        if older_than is not None:
+            clauses.append("created < ?")
+            params.append(time.time() - older_than)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock, self.connect() as conn:
+            return conn.execute(f"DELETE FROM results{where}", params).rowcount
+
+    def count(self):
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inspect or invalidate the evaluation result cache')
+    parser.add_argument('--path', type=str, default='smac_his/result_cache.db', help='cache database file')
+    parser.add_argument('--workload', type=str, default=None, help='only entries of this workload file')
+    parser.add_argument('--database', type=str, default=None, help='only entries of this database')
+    parser.add_argument('--older_than', type=float, default=None, help='only entries older than this many seconds')
+    parser.add_argument('--clear', action='store_true', help='delete the matching entries')
+    args = parser.parse_args()
+    cache = ResultCache(args.path)
+    if args.clear:
+        print(f"Removed {cache.invalidate(args.workload, args.database, args.older_than)} cached results")
+    print(f"{cache.count()} cached results in {args.path}")
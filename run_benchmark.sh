@@ -1,4 +1,5 @@
-cd /home/farshedvardtgem22/E2ETune/benchbase/target/benchbase-postgres
+# BenchBase install directory, override with BENCHBASE_ROOT
+cd "${BENCHBASE_ROOT:-$(dirname "$(realpath "$0")")/benchbase/target/benchbase-postgres}"
 # log the current directory
 pwd
 BENCHNAME=$1
@@ -7,4 +8,4 @@ OUTPUTDIR="$(realpath "$3")"  # Convert to absolute path
 OUTPUTLOG="$(realpath "$4")"  # Convert to absolute path
 CONFIGFILE=${5:-"sample_${BENCHNAME}_config.xml"}  # Use provided config or default
 
-java -jar benchbase.jar -b $BENCHNAME -c config/postgres/$CONFIGFILE --execute=true --directory=$OUTPUTDIR > ${OUTPUTLOG}/${BENCHNAME}_${TIMESTAMP}.log
\ No newline at end of file
+java ${JVM_OPTS} -jar benchbase.jar -b $BENCHNAME -c config/postgres/$CONFIGFILE --execute=true --directory=$OUTPUTDIR > ${OUTPUTLOG}/${BENCHNAME}_${TIMESTAMP}.log
\ No newline at end of file
@@ -0,0 +1,173 @@
+import atexit
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# bumped whenever the fields of an offline sample change
+schema_version = 2
+
+# one sink per (path, backend) in this process, see shared_sink
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def plain(value):
+    """JSON fallback for numpy scalars and arrays in samples"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_jsonl(records):
+    return ''.join(json.dumps(r, default=plain) + '\n' for r in records).encode('utf-8')
+
+
+def encode_msgpack(records):
+    return b''.join(msgpack.packb(r, use_bin_type=True, default=plain) for r in records)
+
+
+class SampleSink:
+    """
+    Single writer for offline samples.
+
+    Records are queued by write() and appended by one background thread in
+    batches (batch_size records or every flush_interval seconds). Each batch is
+    one write() on an O_APPEND descriptor under an exclusive flock, followed by
+    fsync, so processes sharing the file never interleave partial lines.
+    backend 'msgpack' appends a msgpack stream instead of JSON lines.
+    """
+    def __init__(self, path='smac_his/offline_sample.jsonl', backend='jsonl', batch_size=1, flush_interval=5.0):
+        if backend == 'msgpack':
+            if msgpack is None:
+                raise ImportError("msgpack is required for the msgpack sample backend: pip install msgpack")
+            path = os.path.splitext(path)[0] + '.msgpack'
+            self.encode = encode_msgpack
+        else:
+            self.encode = encode_jsonl
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        """Queue a copy of record with the schema version, the caller's dict is not modified"""
+        sample = dict(record)
+        sample['schema_version'] = schema_version
+        self.queue.put(sample)
+
+    def flush(self):
+        """Block until every queued record is on disk, waits for at most one flush_interval"""
+        self.queue.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def run(self):
+        batch = []
+        deadline = None
+        closing = False
+        while not closing:
+            timeout = max(0.0, deadline - time.time()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+                if item is None:
+                    closing = True
+                    self.queue.task_done()
+                else:
+                    if not batch:
+                        deadline = time.time() + self.flush_interval
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (closing or len(batch) >= self.batch_size or time.time() >= deadline):
+                self.append(batch)
+                for _ in batch:
+                    self.queue.task_done()
+                batch = []
+
+    def encode_batch(self, records):
+        """Encoded records, skipping (and logging) the ones that cannot be serialized"""
+        try:
+            return self.encode(records)
+        except (TypeError, ValueError):
+            pass
+        encoded = []
+        for record in records:
+            try:
+                encoded.append(self.encode([record]))
+            except (TypeError, ValueError) as e:
+                print(f"Dropping sample that cannot be serialized: {e}")
+        return b''.join(encoded)
+
+    def append(self, records):
+        """Write one batch; errors are logged, never raised, so the writer thread keeps draining"""
+        try:
+            data = self.encode_batch(records)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        except Exception as e:
+            print(f"Error writing {len(records)} samples to {self.path}: {e}")
+
+
+def shared_sink(path='smac_his/offline_sample.jsonl', backend='jsonl', batch_size=1, flush_interval=5.0):
+    """
+    The process-wide SampleSink of path and backend, created on first use, so
+    executors created per workload do not each start a writer thread.
+    """
+    with _sinks_lock:
+        sink = _sinks.get((path, backend))
+        if sink is None or not sink.thread.is_alive():
+            sink = SampleSink(path, backend, batch_size, flush_interval)
+            _sinks[(path, backend)] = sink
+        return sink
+
+
+def read_samples(path):
+    """All samples of a JSONL or msgpack sample file, skipping a torn final line"""
+    if path.endswith('.msgpack'):
+        if msgpack is None:
+            raise ImportError("msgpack is required to read msgpack samples: pip install msgpack")
+        with open(path, 'rb') as f:
+            return list(msgpack.Unpacker(f, raw=False))
+    samples = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                samples.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return samples
+
+
+def load_samples(path):
+    """
+    Samples written for sample path by either backend: path itself and the
+    .msgpack file the msgpack backend writes in its place.
+    """
+    samples = []
+    for candidate in dict.fromkeys([path, os.path.splitext(path)[0] + '.msgpack']):
+        if os.path.exists(candidate):
+            samples.extend(read_samples(candidate))
+    return samples
@@ -0,0 +1,62 @@
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.util.Arrays;
+
+/**
+ * Long-lived BenchBase driver used by benchbase_service.py.
+ *
+ * Launched once with benchbase.jar and lib/* on the classpath (java source-launcher mode,
+ * no separate compile step). Each stdin line "RUN\t<id>\t<arg>\t<arg>..." runs
+ * com.oltpbenchmark.DBWorkload.main(args) inside this JVM, so classloading and JIT
+ * warm-up are paid once. Completion is reported as "@@SERVICE DONE <id> <rc> <ms>".
+ * "QUIT" or end of stdin stops the service.
+ */
+public class BenchBaseService {
+    public static void main(String[] args) throws Exception {
+        Class<?> workload = Class.forName("com.oltpbenchmark.DBWorkload");
+        Method entry = workload.getMethod("main", String[].class);
+        PrintStream out = System.out;
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+
+        out.println("@@SERVICE READY");
+        out.flush();
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            line = line.trim();
+            if (line.isEmpty()) {
+                continue;
+            }
+            if (line.equals("QUIT")) {
+                break;
+            }
+            String[] parts = line.split("\t");
+            if (parts.length < 2 || !parts[0].equals("RUN")) {
+                out.println("@@SERVICE ERROR unknown request: " + line);
+                out.flush();
+                continue;
+            }
+            String id = parts[1];
+            String[] runArgs = Arrays.copyOfRange(parts, 2, parts.length);
+            int rc = 0;
+            long start = System.nanoTime();
+            try {
+                entry.invoke(null, (Object) runArgs);
+            } catch (InvocationTargetException e) {
+                e.getCause().printStackTrace();
+                rc = 1;
+            } catch (Throwable t) {
+                t.printStackTrace();
+                rc = 1;
+            }
+            long elapsedMs = (System.nanoTime() - start) / 1000000L;
+            System.out.flush();
+            System.err.flush();
+            out.println("@@SERVICE DONE " + id + " " + rc + " " + elapsedMs);
+            out.flush();
+        }
+    }
+}
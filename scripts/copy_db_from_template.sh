@@ -1,25 +1,34 @@
 #!/bin/bash
 # filepath: /home/karimnazarovj/gptuner/scripts/copy_db_from_template.sh
+# usage: copy_db_from_template.sh [database] [host] [port] [user] [template]
+# the password is taken from PGPASSWORD
 
-echo "Recreating tpcc_50 database from template..."
+DATABASE=${1:-tpcc_50}
+HOST=${2:-localhost}
+PORT=${3:-5432}
+DB_USER=${4:-postgres}
+TEMPLATE=${5:-${DATABASE}_template}
+export PGPASSWORD=${PGPASSWORD:-123456}
+
+echo "Recreating $DATABASE database from template on $HOST:$PORT..."
 
 # Connect to PostgreSQL and recreate the database
 # Step 1: Terminate connections
-PGPASSWORD=123456 psql -h localhost -p 5432 -U postgres -c "
+psql -h "$HOST" -p "$PORT" -U "$DB_USER" -c "
 SELECT pg_terminate_backend(pid)
 FROM pg_stat_activity
-WHERE datname = 'tpcc_50' AND pid <> pg_backend_pid();
+WHERE datname = '$DATABASE' AND pid <> pg_backend_pid();
 "
 
 # Step 2: Drop the existing database
-PGPASSWORD=123456 psql -h localhost -p 5432 -U postgres -c "DROP DATABASE IF EXISTS tpcc_50;"
+psql -h "$HOST" -p "$PORT" -U "$DB_USER" -c "DROP DATABASE IF EXISTS $DATABASE;"
 
 # Step 3: Create new database from template
-PGPASSWORD=123456 psql -h localhost -p 5432 -U postgres -c "CREATE DATABASE tpcc_50 WITH TEMPLATE tpcc_50_template;"
+psql -h "$HOST" -p "$PORT" -U "$DB_USER" -c "CREATE DATABASE $DATABASE WITH TEMPLATE $TEMPLATE;"
 
 # Step 4: Check database size
 echo "Checking database size..."
-PGPASSWORD=123456 psql -h localhost -p 5432 -U postgres -c "SELECT pg_size_pretty(pg_database_size('tpcc_50')) AS size;"
+psql -h "$HOST" -p "$PORT" -U "$DB_USER" -c "SELECT pg_size_pretty(pg_database_size('$DATABASE')) AS size;"
 
-echo "Database tpcc_50 recreated from tpcc_50_template successfully!"
-echo "You can now run the TPC-C optimization script."
\ No newline at end of file
+echo "Database $DATABASE recreated from $TEMPLATE successfully!"
+echo "You can now run the TPC-C optimization script."
@@ -0,0 +1,98 @@
+import hashlib
+import re
+
+# Quoted string (with '' escapes) or a standalone numeric literal
+literal_pattern = re.compile(r"'(?:[^']|'')*'|(?<![\w.$])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.])")
+space_pattern = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Replace every literal with '?' so queries differing only in constants share a template"""
+    template = literal_pattern.sub('?', sql)
+    return space_pattern.sub(' ', template).strip().rstrip(';').strip()
+
+
+def template_id(template):
+    return hashlib.md5(template.encode('utf-8')).hexdigest()[:12]
+
+
+token_pattern = re.compile(r"""
+    (?P<string>'(?:[^']|'')*')
+  | (?P<number>(?<![\w.$])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.]))
+  | (?P<word>[A-Za-z_][\w$]*)
+  | (?P<op><>|!=|<=|>=|::|[=<>(),])
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+comparison_ops = {'=', '<', '>', '<=', '>=', '<>', '!='}
+pattern_ops = {'LIKE', 'ILIKE', 'LIMIT', 'OFFSET', 'BETWEEN'}
+
+
+def parameterize(sql):
+    """
+    Turn the literals of a statement into $n parameters.
+    Only literals in value positions are replaced (comparison operands, LIKE
+    patterns, BETWEEN bounds, IN lists, LIMIT/OFFSET), so positional
+    ORDER BY/GROUP BY references and typed literals such as date '...' keep
+    their meaning. Returns the template and the original literal tokens.
+    """
+    out = []
+    params = []
+    prev = None
+    between = False
+    parens = []
+    for m in token_pattern.finditer(sql.strip().rstrip(';')):
+        kind = m.lastgroup
+        text = m.group()
+        if kind == 'space':
+            out.append(' ')
+            continue
+        if kind in ('string', 'number'):
+            in_list = bool(parens) and parens[-1] and prev in ('(', ',')
+            between_end = between and prev == 'AND'
+            if prev in comparison_ops or prev in pattern_ops or in_list or between_end:
+                params.append(text)
+                out.append(f"${len(params)}")
+                if between_end:
+                    between = False
+                prev = '$'
+                continue
+        elif kind == 'op' and text == '(':
+            parens.append(prev == 'IN')
+        elif kind == 'op' and text == ')' and parens:
+            parens.pop()
+        upper = text.upper()
+        if upper == 'BETWEEN':
+            between = True
+        out.append(text)
+        prev = upper
+    return ''.join(out).strip(), params
+
+
+class PreparedStatements:
+    """
+    Server-side prepared statements of one connection, keyed by query template.
+    Templates that fail to PREPARE or EXECUTE are remembered and run as plain text.
+    """
+    def __init__(self):
+        self.names = {}
+        self.failed = set()
+
+    def plan(self, sql):
+        """Return (prepare_sql or None, execute_sql, template) for a raw statement"""
+        template, params = parameterize(sql)
+        if not params or template in self.failed:
+            return None, sql, None
+        name = self.names.get(template)
+        if name is not None:
+            return None, f"EXECUTE {name} ({', '.join(params)})", template
+        name = 'wg_' + template_id(template)
+        return f"PREPARE {name} AS {template}", f"EXECUTE {name} ({', '.join(params)})", template
+
+    def prepared(self, template, prepare_sql):
+        self.names[template] = prepare_sql.split()[1]
+
+    def fail(self, template):
+        self.names.pop(template, None)
+        self.failed.add(template)
@@ -0,0 +1,144 @@
+import collections
+import os
+import threading
+import time
+import numpy as np
+
+# cumulative counters polled on every tick, stored as deltas between ticks
+counters = [
+    'xact_commit', 'xact_rollback', 'blks_read', 'blks_hit', 'tup_returned', 'tup_fetched',
+    'tup_inserted', 'tup_updated', 'tup_deleted', 'temp_bytes', 'deadlocks',
+    'checkpoints_timed', 'checkpoints_req', 'buffers_checkpoint', 'buffers_clean',
+    'buffers_backend', 'buffers_backend_fsync', 'wal_records', 'wal_fpi', 'wal_bytes',
+]
+
+sample_sql = """
+WITH db AS (
+    SELECT xact_commit, xact_rollback, blks_read, blks_hit, tup_returned, tup_fetched,
+           tup_inserted, tup_updated, tup_deleted, temp_bytes, deadlocks
+    FROM pg_stat_database WHERE datname = current_database()
+), bg AS (
+    SELECT checkpoints_timed, checkpoints_req, buffers_checkpoint, buffers_clean,
+           buffers_backend, buffers_backend_fsync
+    FROM pg_stat_bgwriter
+), wal AS (
+    SELECT wal_records, wal_fpi, wal_bytes FROM pg_stat_wal
+), waits AS (
+    SELECT COALESCE(json_object_agg(wait_event_type, n), '{}') AS waits FROM (
+        SELECT COALESCE(wait_event_type, 'CPU') AS wait_event_type, count(*) AS n
+        FROM pg_stat_activity
+        WHERE state = 'active' AND pid <> pg_backend_pid() AND backend_type = 'client backend'
+        GROUP BY 1
+    ) w
+)
+SELECT db.*, bg.*, wal.*, waits.waits FROM db, bg, wal, waits;
+"""
+
+
+class StatsSampler:
+    """
+    Background thread polling PostgreSQL statistics every interval_ms during a run.
+    Cumulative counters are kept as int64 deltas between ticks and the number of
+    active backends per wait event type as a gauge, in a ring buffer of at most
+    capacity ticks. One query per tick on a dedicated connection.
+    """
+    def __init__(self, db, interval_ms=1000, capacity=3600):
+        self.db = db
+        self.interval = interval_ms / 1000.0
+        self.samples = collections.deque(maxlen=capacity)
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last = None
+        self.error = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def run(self):
+        try:
+            conn = self.db.get_conn()
+            conn.autocommit = True
+        except Exception as e:
+            self.error = e
+            print(f"Stats sampler could not connect: {e}")
+            return
+        cursor = conn.cursor()
+        try:
+            while True:
+                self.tick(cursor)
+                if self.stop_event.wait(self.interval):
+                    # one last tick so the tail of the run is covered
+                    self.tick(cursor)
+                    break
+        except Exception as e:
+            self.error = e
+            print(f"Stats sampler stopped: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+
+    def tick(self, cursor):
+        cursor.execute(sample_sql)
+        row = cursor.fetchone()
+        now = time.time()
+        values = np.array([int(v or 0) for v in row[:len(counters)]], dtype=np.int64)
+        waits = row[len(counters)] or {}
+        if self.last is not None:
+            last_time, last_values = self.last
+            # a pg_stat_reset between ticks drops the counters, count that interval from zero
+            deltas = values - last_values
+            deltas = np.where(deltas < 0, values, deltas)
+            self.samples.append((now - last_time, deltas, waits))
+        self.last = (now, values)
+
+    def to_arrays(self):
+        """Interval lengths, counter deltas and wait event gauges as numpy arrays"""
+        samples = list(self.samples)
+        wait_types = sorted({t for _, _, waits in samples for t in waits})
+        return {
+            'interval': np.array([s[0] for s in samples], dtype=np.float64),
+            'deltas': np.array([s[1] for s in samples], dtype=np.int64).reshape(len(samples), len(counters)),
+            'counters': np.array(counters),
+            'wait_types': np.array(wait_types),
+            'waits': np.array([[s[2].get(t, 0) for t in wait_types] for s in samples],
+                              dtype=np.int32).reshape(len(samples), len(wait_types)),
+        }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, **self.to_arrays())
+        return path
+
+    def rate_features(self):
+        """
+        Per-second rates over the run: mean and peak rate of each counter
+        (peaks expose checkpoint and I/O bursts) and the average number of
+        active backends per wait event type.
+        """
+        arrays = self.to_arrays()
+        if len(arrays['interval']) == 0:
+            return {}
+        rates = arrays['deltas'] / arrays['interval'][:, None]
+        total_time = arrays['interval'].sum()
+        features = {}
+        for i, name in enumerate(counters):
+            features[f'{name}_rate'] = float(arrays['deltas'][:, i].sum() / total_time)
+            features[f'{name}_rate_max'] = float(rates[:, i].max())
+        for i, wait_type in enumerate(arrays['wait_types']):
+            features[f'wait_{wait_type}'] = float(arrays['waits'][:, i].mean())
+        return features
@@ -3,10 +3,13 @@ from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import cross_val_score, train_test_split, KFold
 from sklearn.metrics import r2_score
 import json
-import jsonlines
+import os
+import sys
 import joblib
 import random
 import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sample_sink import load_samples
 
 
 def my_cross_val(model, data, database):
@@ -74,30 +77,29 @@ def train_surrogate(database):
     # features = json.load(open(f'SuperWG/feature/{database}.json'))
 
     data = {}
-    with jsonlines.open(f'collected_samples.jsonl', 'r') as f:
-        for record in f:
-            x = []
+    for record in load_samples('collected_samples.jsonl'):
+        x = []
             
-            # Add normalized knob values (44 features)
-            for key in record.keys():
-                # skip non-knob fields
-                if key in ('y', 'workload', 'tps', 'inner_metrics', 'config_id'): 
+        # Add normalized knob values (44 features)
+        for key in record.keys():
+            # skip non-knob fields
+            if key in ('y', 'workload', 'tps', 'inner_metrics', 'config_id') or key not in knobs: 
+                continue
+            else:
+                detail = knobs[key]
+                if detail['max'] - detail['min'] != 0:
+                    x.append((record[key] - detail['min']) / (detail['max'] - detail['min']))
+                else: 
                     continue
-                else:
-                    detail = knobs[key]
-                    if detail['max'] - detail['min'] != 0:
-                        x.append((record[key] - detail['min']) / (detail['max'] - detail['min']))
-                    else: 
-                        continue
             
-            # Add inner metrics (14 features)
-            x += record['inner_metrics']
+        # Add inner metrics (14 features)
+        x += record['inner_metrics']
             
-            # Total features: 44 knobs + 14 inner metrics = 58 features
-            if record['workload'] in data.keys(): 
-                data[record['workload']].append([x, record['y'][0]])
-            else: 
-                data[record['workload']] = [[x, record['y'][0]]]
+        # Total features: 44 knobs + 14 inner metrics = 58 features
+        if record['workload'] in data.keys(): 
+            data[record['workload']].append([x, record['y'][0]])
+        else: 
+            data[record['workload']] = [[x, record['y'][0]]]
 
     rf = RandomForestRegressor(n_estimators=500, random_state=42)
     gb = GradientBoostingRegressor(random_state=42)
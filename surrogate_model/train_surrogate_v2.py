@@ -9,10 +9,13 @@ from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, V
 from sklearn.model_selection import KFold
 from sklearn.metrics import r2_score
 import json
-import jsonlines
+import os
+import sys
 import joblib
 import numpy as np
 from collections import defaultdict
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sample_sink import load_samples
 
 
 def load_data_by_workload(jsonl_path, knob_config_path):
@@ -21,22 +24,21 @@ def load_data_by_workload(jsonl_path, knob_config_path):
     
     data = defaultdict(list)  # workload -> [(x, y), ...]
     
-    with jsonlines.open(jsonl_path, 'r') as f:
-        for record in f:
-            x = []
-            # Normalized knob values
-            for key in record.keys():
-                if key in ('y', 'workload', 'tps', 'inner_metrics', 'config_id'):
-                    continue
-                detail = knobs[key]
-                if detail['max'] - detail['min'] != 0:
-                    x.append((record[key] - detail['min']) / (detail['max'] - detail['min']))
+    for record in load_samples(jsonl_path):
+        x = []
+        # Normalized knob values
+        for key in record.keys():
+            if key in ('y', 'workload', 'tps', 'inner_metrics', 'config_id') or key not in knobs:
+                continue
+            detail = knobs[key]
+            if detail['max'] - detail['min'] != 0:
+                x.append((record[key] - detail['min']) / (detail['max'] - detail['min']))
             
-            # Add inner metrics
-            x += record['inner_metrics']
+        # Add inner metrics
+        x += record['inner_metrics']
             
-            y_val = record['y'][0]  # throughput
-            data[record['workload']].append((x, y_val))
+        y_val = record['y'][0]  # throughput
+        data[record['workload']].append((x, y_val))
     
     return data
 
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import numpy as np
+
+
+class SurrogateSearch:
+    """
+    Evolutionary search directly against a trained surrogate model.
+
+    Configurations are kept as a matrix of normalized knob values and scored
+    with one batched predict() per generation, so tens of thousands of
+    evaluations take seconds. Feature rows follow run_config_surrogate:
+    normalized knobs with a non-empty range in knob_order, then the inner
+    metrics. knob_order defaults to sorted names, the order in which SMAC's
+    ConfigSpace hands configurations to the objective function.
+    """
+    def __init__(self, knobs, model, internal_metrics, y_min=None, y_max=None, knob_order=None, seed=42):
+        self.knobs = knobs
+        self.model = model
+        self.names = list(knob_order or sorted(knobs))
+        self.low = np.array([knobs[n]['min'] for n in self.names], dtype=np.float64)
+        self.high = np.array([knobs[n]['max'] for n in self.names], dtype=np.float64)
+        self.integer = np.array([knobs[n]['type'] == 'integer' for n in self.names])
+        self.span = self.high - self.low
+        self.features = self.span != 0
+        metrics = list(internal_metrics.values()) if isinstance(internal_metrics, dict) else list(internal_metrics)
+        self.metrics = np.array(metrics, dtype=np.float64)
+        self.y_min = y_min
+        self.y_max = y_max
+        self.rng = np.random.default_rng(seed)
+
+    def snap(self, x):
+        """Clip to [0, 1] and move integer knobs onto integer values"""
+        x = np.clip(x, 0.0, 1.0)
+        values = self.low + x * self.span
+        values[:, self.integer] = np.round(values[:, self.integer])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.where(self.span != 0, (values - self.low) / self.span, 0.0)
+        return x
+
+    def predict(self, x):
+        """Predicted throughput for each row of normalized knob values"""
+        features = np.hstack([x[:, self.features], np.tile(self.metrics, (len(x), 1))])
+        predicted = self.model.predict(features)
+        if self.y_min is not None and self.y_max is not None:
+            predicted = predicted * (self.y_max - self.y_min) + self.y_min
+        return predicted
+
+    def default_point(self):
+        values = np.array([self.knobs[n]['default'] for n in self.names], dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.span != 0, (values - self.low) / self.span, 0.0)
+
+    def search(self, evaluations=20000, population=500, elite=0.1, sigma=0.2, min_sigma=0.01):
+        """
+        (mu + lambda) evolution: keep the best elite fraction, refill the
+        population with uniform crossover of elites plus Gaussian mutation,
+        sigma decaying towards min_sigma. Returns (x, predicted qps, seconds)
+        for every evaluated configuration.
+        """
+        start = time.time()
+        pop = self.snap(np.vstack([self.default_point(), self.rng.random((population - 1, len(self.names)))]))
+        scores = self.predict(pop)
+        evaluated_x, evaluated_y = [pop], [scores]
+        generations = max(1, (evaluations - population) // population)
+        n_elite = max(2, int(elite * population))
+        for generation in range(generations):
+            order = np.argsort(-scores)[:n_elite]
+            parents = pop[order]
+            step = max(min_sigma, sigma * (1 - generation / generations))
+            a = parents[self.rng.integers(n_elite, size=population)]
+            b = parents[self.rng.integers(n_elite, size=population)]
+            mask = self.rng.random(a.shape) < 0.5
+            children = self.snap(np.where(mask, a, b) + self.rng.normal(0, step, a.shape))
+            child_scores = self.predict(children)
+            evaluated_x.append(children)
+            evaluated_y.append(child_scores)
+            pop = np.vstack([parents, children])
+            scores = np.concatenate([scores[order], child_scores])
+        x = np.vstack(evaluated_x)
+        y = np.concatenate(evaluated_y)
+        return x, y, time.time() - start
+
+    def to_config(self, x):
+        values = self.low + x * self.span
+        return {name: int(round(v)) if is_int else float(v)
+                for name, v, is_int in zip(self.names, values, self.integer)}
+
+
+def write_runhistory(path, configs, costs, elapsed):
+    """SMAC 1.2 runhistory.json: cost is negative throughput, as in the SMAC objective"""
+    data, stored = [], {}
+    now = time.time()
+    per_eval = elapsed / max(1, len(configs))
+    for config_id, (config, cost) in enumerate(zip(configs, costs), start=1):
+        stored[str(config_id)] = config
+        data.append([[config_id, None, 0, 0.0],
+                     [float(cost), per_eval, {"__enum__": "StatusType.SUCCESS"}, now, now, {}]])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"data": data, "config_origins": {k: "Surrogate Search" for k in stored}, "configs": stored}, f)
+    return path
+
+
+def run_surrogate_search(executor, knobs, output_dir, evaluations=20000, population=500, keep=1000, seed=42):
+    """
+    Search knobs with the executor's surrogate model and write the best keep distinct
+    configurations (plus the default) to output_dir/run_<seed>/runhistory.json.
+    Returns (best config, best predicted qps).
+    """
+    if executor.surrogate_model is None:
+        raise ValueError("Surrogate model not loaded. Train it first or check model_path in config.")
+    search = SurrogateSearch(knobs, executor.surrogate_model, executor.internal_metrics,
+                             executor.y_min, executor.y_max, seed=seed)
+    x, y, elapsed = search.search(evaluations, population)
+    print(f"Surrogate search evaluated {len(y)} configurations in {elapsed:.2f} seconds")
+
+    _, unique = np.unique(np.round(x, 6), axis=0, return_index=True)
+    best = unique[np.argsort(-y[unique])][:keep]
+    # evaluation 0 is the default configuration
+    rows = [0] + [i for i in best if i != 0]
+    configs = [search.to_config(x[i]) for i in rows]
+    path = write_runhistory(os.path.join(output_dir, f'run_{seed}', 'runhistory.json'),
+                            configs, [-y[i] for i in rows], elapsed)
+    print(f"Surrogate search runhistory written to {path}")
+    return configs[1] if len(configs) > 1 else configs[0], float(y[rows[1] if len(rows) > 1 else 0])
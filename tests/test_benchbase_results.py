@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Offline test for BenchBase raw.csv ingestion, no BenchBase run needed
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchbase_results import ingest_results, load_results
+from throughput_stability import analyze
+
+
+def write_raw(output_dir):
+    with open(os.path.join(output_dir, 'tpcc_1.raw.csv'), 'w') as f:
+        f.write("Transaction Type Index,Transaction Name,Start Time (microseconds),Latency (microseconds),"
+                "Worker Id (start number),Phase Id (index in config file)\n")
+        for i in range(300):
+            name = 'NewOrder' if i % 3 else 'Payment'
+            f.write(f"1,{name},{1700000000 + i / 100.0:.6f},{1000 * (i % 10 + 1)},0,0\n")
+
+
+def test_ingest():
+    output_dir = tempfile.mkdtemp()
+    write_raw(output_dir)
+    summary = ingest_results(output_dir, os.path.join(output_dir, 'metrics'), 'run')
+    assert summary['latency']['overall']['count'] == 300
+    assert abs(summary['txn_throughput']['Payment'] - 100 / 3) < 1e-9
+    assert summary['series'] == [100.0, 100.0, 100.0]
+    assert 0.009 < summary['latency']['templates']['NewOrder']['p99'] < 0.0105
+    columns = load_results(summary['npz_path'])
+    assert list(columns['txn_types']) == ['NewOrder', 'Payment']
+    assert columns['txn_throughput'].shape == (2, 3)
+    assert columns['txn_throughput'].sum() == 300
+
+
+def test_stability():
+    rng = np.random.default_rng(0)
+    # 10 seconds of cold-cache ramp-up, then a steady 1000 tps
+    series = np.concatenate([np.linspace(100, 900, 10), 1000 + rng.normal(0, 10, 120)])
+    result = analyze(series)
+    assert 5 <= result['warmup_seconds'] <= 15, result
+    assert abs(result['steady_throughput'] - 1000) < 5
+    assert result['ci_low'] < 1000 < result['ci_high']
+    assert result['raw_throughput'] < result['steady_throughput']
+    assert not result['noisy']
+    assert analyze(1000 + rng.normal(0, 400, 120))['noisy']
+
+
+def main():
+    test_ingest()
+    test_stability()
+    print("✓ SUCCESS: BenchBase result ingestion tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Offline test for the tuning job queue: ordering, retries and stale workers
+"""
+
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from job_queue import JobQueue
+
+
+def test_priority_and_dedup():
+    queue = JobQueue(os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+    first = queue.add('a.wg')
+    second = queue.add('b.wg', budget=500)
+    assert queue.add('a.wg') == first
+    assert queue.add('a.wg', mode='real') != first
+    queue.set_priority(second, 10)
+    job = queue.claim('w1')
+    assert job['id'] == second and job['state'] == 'running' and job['budget'] == 500
+    assert queue.claim('w2')['id'] == first
+    assert queue.complete(first, 'w2', {'shared_buffers': 1024})
+    assert queue.get(first)['state'] == 'done'
+    assert queue.add('a.wg') == first
+    rerun = queue.add('a.wg', force=True)
+    assert rerun != first and queue.get(rerun)['state'] == 'pending'
+
+
+def test_retry():
+    queue = JobQueue(os.path.join(tempfile.mkdtemp(), 'jobs.db'), max_attempts=2, retry_delay=0.2)
+    job_id = queue.add('a.wg')
+    queue.claim('w1')
+    queue.fail(job_id, 'w1', 'RuntimeError: benchmark crashed')
+    assert queue.get(job_id)['state'] == 'pending'
+    assert queue.claim('w1') is None  # backing off
+    time.sleep(0.25)
+    assert queue.claim('w1')['attempts'] == 2
+    queue.fail(job_id, 'w1', 'RuntimeError: benchmark crashed')
+    assert queue.get(job_id)['state'] == 'failed'
+    assert queue.retry(job_id) == 1
+    assert queue.claim('w1')['attempts'] == 1
+
+
+def test_stale_worker():
+    queue = JobQueue(os.path.join(tempfile.mkdtemp(), 'jobs.db'), max_attempts=2, retry_delay=0, stale_timeout=0.1)
+    job_id = queue.add('a.wg')
+    queue.claim('dead')
+    time.sleep(0.15)
+    job = queue.claim('alive')
+    assert job['id'] == job_id and job['worker'] == 'alive' and job['attempts'] == 2
+    # the stalled worker finishing late must not overwrite the new attempt
+    assert not queue.complete(job_id, 'dead', {'shared_buffers': 1024})
+    assert not queue.fail(job_id, 'dead', 'RuntimeError: late')
+    assert queue.get(job_id)['state'] == 'running' and queue.get(job_id)['result'] is None
+    time.sleep(0.15)
+    # the job killed both of its workers
+    assert queue.claim('third') is None
+    assert queue.get(job_id)['state'] == 'failed'
+    assert queue.get(job_id)['error'] == 'worker lost: alive'
+
+
+def main():
+    test_priority_and_dedup()
+    test_retry()
+    test_stale_worker()
+    print("✓ SUCCESS: job queue tests passed!")
+
+
+if __name__ == "__main__":
+    main()
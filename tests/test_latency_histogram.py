@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline test for LatencyHistogram and query template fingerprints, no database needed
+"""
+
+import os
+import random
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from latency_histogram import LatencyHistogram, TemplateLatency
+from sql_template import PreparedStatements, fingerprint, parameterize, template_id
+
+
+def test_percentiles():
+    random.seed(0)
+    values = [random.uniform(0.001, 2.0) for _ in range(10000)]
+    hist = LatencyHistogram()
+    for v in values:
+        hist.record(v)
+    values.sort()
+    for p in (50, 95, 99):
+        exact = values[int(p / 100.0 * len(values)) - 1]
+        assert abs(hist.percentile(p) - exact) / exact < 0.02, (p, hist.percentile(p), exact)
+    assert hist.count == len(values)
+    # memory is bounded by the bucket layout, not by the number of samples
+    assert len(hist.counts) < 1000
+
+
+def test_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    for _ in range(100):
+        a.record(0.01)
+        b.record(1.0)
+    a.merge(b)
+    assert a.count == 200
+    assert a.percentile(25) < 0.011
+    assert a.percentile(99) > 0.98
+
+
+def test_templates():
+    q1 = "SELECT * FROM t WHERE a = 5 AND b LIKE '%x%';"
+    q2 = "SELECT * FROM t WHERE a = 17 AND b LIKE '%it''s%';"
+    assert fingerprint(q1) == fingerprint(q2) == "SELECT * FROM t WHERE a = ? AND b LIKE ?"
+    assert fingerprint("SELECT t1.c2 FROM t1") == "SELECT t1.c2 FROM t1"
+    latency = TemplateLatency()
+    for q in (q1, q2):
+        template = fingerprint(q)
+        latency.record(template_id(template), template, 0.5)
+    summary = latency.to_dict()
+    assert summary['overall']['count'] == 2
+    assert len(summary['templates']) == 1
+
+
+def test_parameterize():
+    template, params = parameterize(
+        "SELECT a, COUNT(*) FROM t WHERE b BETWEEN 1 AND 9 AND c IN ('x', 'y') "
+        "AND d >= date '1995-01-01' AND e LIKE '%z%' GROUP BY 1 ORDER BY 2 LIMIT 10;")
+    assert template == ("SELECT a, COUNT(*) FROM t WHERE b BETWEEN $1 AND $2 AND c IN ($3, $4) "
+                        "AND d >= date '1995-01-01' AND e LIKE $5 GROUP BY 1 ORDER BY 2 LIMIT $6")
+    assert params == ['1', '9', "'x'", "'y'", "'%z%'", '10']
+
+    prepared = PreparedStatements()
+    prepare_sql, execute_sql, template = prepared.plan("SELECT * FROM t WHERE a = 5")
+    assert prepare_sql.endswith("AS SELECT * FROM t WHERE a = $1")
+    prepared.prepared(template, prepare_sql)
+    prepare_sql, execute_sql, _ = prepared.plan("SELECT * FROM t WHERE a = 7")
+    assert prepare_sql is None and execute_sql.endswith("(7)")
+    prepared.fail(template)
+    assert prepared.plan("SELECT * FROM t WHERE a = 7") == (None, "SELECT * FROM t WHERE a = 7", None)
+
+
+def main():
+    test_percentiles()
+    test_merge()
+    test_templates()
+    test_parameterize()
+    print("✓ SUCCESS: latency histogram tests passed!")
+
+
+if __name__ == "__main__":
+    main()
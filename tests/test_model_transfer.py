@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Offline test for warm-start transfer between workloads, on synthetic SMAC runhistories
+"""
+
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from model_transfer import load_priors, transfer_design
+
+knobs = {
+    'shared_buffers': {'min': 16, 'max': 1024, 'default': 128, 'type': 'integer'},
+    'random_page_cost': {'min': 1.0, 'max': 4.0, 'default': 4.0, 'type': 'float'},
+}
+
+
+def write_session(save_workload, optimum, seed, root='.'):
+    """SMAC runhistory and default-run metrics of an OLAP workload, as tune.py names them"""
+    rng = np.random.default_rng(seed)
+    data, configs = [], {}
+    for i in range(1, 31):
+        config = {'shared_buffers': int(rng.integers(16, 1025)), 'random_page_cost': float(rng.uniform(1, 4))}
+        qps = 1000 - abs(config['shared_buffers'] - optimum)
+        configs[str(i)] = config
+        data.append([[i, None, 0, 0.0], [-qps, 1.0, {"__enum__": "StatusType.SUCCESS"}, 0, 1, {}]])
+    run_dir = os.path.join(root, 'tpch', f"{save_workload}_smac_output", 'run_42')
+    os.makedirs(run_dir, exist_ok=True)
+    with open(os.path.join(run_dir, 'runhistory.json'), 'w') as f:
+        json.dump({"data": data, "configs": configs, "config_origins": {}}, f)
+    metrics_file = os.path.join(root, f"internal_metrics/{save_workload}_internal_metrics.json")
+    os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
+    with open(metrics_file, 'w') as f:
+        json.dump({'xact_commit': 1000.0 * seed, 'blks_read': 10.0 * seed}, f)
+
+
+def test_olap_target_excluded():
+    os.chdir(tempfile.mkdtemp())
+    # tune.py's save_workload for ./olap_workloads/tpch_1.wg
+    target = './olap_workloads/tpch_1'
+    write_session(target, optimum=900, seed=1)
+    write_session('./olap_workloads/tpch_2', optimum=200, seed=2)
+    write_session('./olap_workloads/tpch_3', optimum=850, seed=3)
+    priors = load_priors('tpch', knobs, exclude=target)
+    assert sorted(p.workload for p in priors) == ['olap_workloads/tpch_2', 'olap_workloads/tpch_3']
+    with open('internal_metrics/olap_workloads/tpch_1_internal_metrics.json') as f:
+        internal_metrics = json.load(f)
+    configs, ranked = transfer_design('tpch', knobs, target, internal_metrics, n=3)
+    assert [workload for workload, _ in ranked] == ['olap_workloads/tpch_3', 'olap_workloads/tpch_2']
+    assert len(configs) == 3
+    assert all(16 <= c['shared_buffers'] <= 1024 for c in configs)
+
+
+def test_mock_sessions_kept_apart():
+    os.chdir(tempfile.mkdtemp())
+    # backend = mock writes under mock_output_root, real sessions must not see it
+    write_session('./olap_workloads/tpch_1', optimum=900, seed=1)
+    write_session('./olap_workloads/tpch_2', optimum=200, seed=2, root='mock_output')
+    assert [p.workload for p in load_priors('tpch', knobs)] == ['olap_workloads/tpch_1']
+    assert [p.workload for p in load_priors('tpch', knobs, root='mock_output')] == ['olap_workloads/tpch_2']
+
+
+def main():
+    test_olap_target_excluded()
+    test_mock_sessions_kept_apart()
+    print("✓ SUCCESS: model transfer tests passed!")
+
+
+if __name__ == "__main__":
+    main()
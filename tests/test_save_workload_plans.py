@@ -5,9 +5,9 @@ Test file for Database.save_workload_plans method - tests extracting and saving
 
 import os
 import sys
-import re
 sys.path.append('..')
 from Database import Database
+from workload_parser import load_workload
 
 
 def main():
@@ -53,17 +53,8 @@ def main():
             print(f"✗ ERROR: Workload file {workload_path} does not exist!")
             return
         
-        with open(workload_path, 'r') as f:
-            wg_file = f.read()
-        
-        # Split queries similar to multi_thread.py
-        sql_list = re.split(r'[;\n]+', wg_file)
-        for i, it in enumerate(sql_list):
-            sql_list[i] += ";"
-        
-        # Remove empty last element if it exists
-        if sql_list[-1] == ";":
-            sql_list = sql_list[0:-1]
+        # Split queries the same way the OLAP drivers do
+        sql_list = list(load_workload(workload_path))
         
         # Limit to first few queries for testing
         if len(sql_list) > 5:
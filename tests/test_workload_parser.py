@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Offline test for the streaming SQL splitter and the workload cache, no database needed
+"""
+
+import io
+import os
+import sys
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import workload_parser
+from workload_parser import iter_statements, load_workload
+
+
+def split(text):
+    return list(iter_statements(io.StringIO(text)))
+
+
+def test_split():
+    text = """SELECT 1;
+-- a comment; with a semicolon
+SELECT 'a;b', "odd;name" FROM t; /* block ; /* nested; */ comment */ SELECT
+  2
+  ;
+SELECT $$ body; $$, $tag$ x;y $tag$;
+SELECT 'it''s; fine' WHERE a = $1
+"""
+    assert split(text) == [
+        "SELECT 1",
+        "SELECT 'a;b', \"odd;name\" FROM t",
+        "SELECT\n  2",
+        "SELECT $$ body; $$, $tag$ x;y $tag$",
+        "SELECT 'it''s; fine' WHERE a = $1",
+    ]
+    assert split(";;\n  ;") == []
+
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as d:
+        a = os.path.join(d, 'a.wg')
+        b = os.path.join(d, 'b.wg')
+        for path in (a, b):
+            with open(path, 'w') as f:
+                f.write("SELECT 1;\nSELECT 2;\n")
+        first = load_workload(a)
+        # same content under another name shares the parsed statements
+        assert load_workload(b) is first
+        with open(a, 'w') as f:
+            f.write("SELECT 3;\n")
+        os.utime(a, ns=(0, 0))
+        assert load_workload(a) == ("SELECT 3",)
+        assert workload_parser.file_digest(a) != workload_parser.file_digest(b)
+
+
+def test_olap_workloads():
+    workload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'olap_workloads')
+    if not os.path.isdir(workload_dir):
+        return
+    for name in sorted(os.listdir(workload_dir))[:20]:
+        path = os.path.join(workload_dir, name)
+        with open(path, 'r') as f:
+            lines = [line.strip().rstrip(';').strip() for line in f if line.strip()]
+        assert list(load_workload(path)) == lines, name
+
+
+def main():
+    test_split()
+    test_cache()
+    test_olap_workloads()
+    print("✓ SUCCESS: workload parser tests passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import numpy as np
+from scipy import stats
+
+
+def mser_truncation(series, batch_size=5):
+    """
+    Warm-up length by MSER-5: average the series in batches of batch_size,
+    then pick the truncation point d minimizing SS(batches[d:]) / (n - d)^2,
+    the sum of squared deviations over the squared length, i.e. var / (n - d).
+    Only the first half of the series is considered, as recommended for MSER.
+    Returns the number of leading samples to discard.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    n_batches = len(series) // batch_size
+    if n_batches < 4:
+        return 0
+    batches = series[:n_batches * batch_size].reshape(n_batches, batch_size).mean(axis=1)
+    best_d, best_score = 0, np.inf
+    for d in range(n_batches // 2):
+        rest = batches[d:]
+        score = rest.var() / len(rest)
+        if score < best_score:
+            best_d, best_score = d, score
+    return best_d * batch_size
+
+
+def batch_means_ci(series, n_batches=10, confidence=0.95):
+    """
+    Mean and confidence half-width by non-overlapping batch means, which
+    absorbs the autocorrelation of per-second throughput samples.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    n_batches = min(n_batches, len(series))
+    if n_batches < 2:
+        return float(series.mean()) if len(series) else 0.0, float('inf')
+    size = len(series) // n_batches
+    means = series[:n_batches * size].reshape(n_batches, size).mean(axis=1)
+    half_width = stats.t.ppf((1 + confidence) / 2, n_batches - 1) * means.std(ddof=1) / np.sqrt(n_batches)
+    return float(means.mean()), float(half_width)
+
+
+def analyze(series, noise_threshold=0.05, confidence=0.95):
+    """
+    Steady-state summary of a per-second throughput series.
+    The run is flagged noisy when the confidence half-width exceeds
+    noise_threshold relative to the steady-state mean.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    if len(series) == 0:
+        return None
+    # the last second is usually partial
+    if len(series) > 1:
+        series = series[:-1]
+    warmup = mser_truncation(series)
+    steady = series[warmup:]
+    mean, half_width = batch_means_ci(steady, confidence=confidence)
+    relative = half_width / mean if mean > 0 else float('inf')
+    return {
+        'warmup_seconds': int(warmup),
+        'steady_seconds': int(len(steady)),
+        'raw_throughput': float(series.mean()),
+        'steady_throughput': mean,
+        'ci_low': mean - half_width,
+        'ci_high': mean + half_width,
+        'relative_half_width': relative,
+        'cv': float(steady.std() / mean) if mean > 0 else float('inf'),
+        'noisy': bool(relative > noise_threshold),
+    }
@@ -1,7 +1,12 @@
 import os
+import copy
+import queue
+import threading
+import multiprocessing
 import time
 import json
 import json
+from concurrent.futures import ProcessPoolExecutor
 from knob_config import parse_knob_config
 import numpy as np
 from Database import Database
@@ -10,15 +15,24 @@ from smac.runhistory.runhistory import RunHistory
 # from smac.tae.execute_ta_run import Status
 from smac.facade.smac_hpo_facade import SMAC4HPO
 from smac.scenario.scenario import Scenario
+from ConfigSpace import Configuration
 from ConfigSpace.hyperparameters import CategoricalHyperparameter, \
     UniformFloatHyperparameter, UniformIntegerHyperparameter
-from workload_executor import workload_executor
+from workload_executor import workload_executor, hot_relations_path
 import utils
+import instrumentation
+from baseline_cache import BaselineCache
+from mock_backend import output_path
+from surrogate_search import run_surrogate_search
+from model_transfer import transfer_design
 
 
 
-def tune(workload_file, args, use_surrogate=False):
-    """Just run SMAC optimization!"""
+def tune(workload_file, args, use_surrogate=False, budget=None):
+    """Just run SMAC optimization! budget overrides the number of evaluations"""
+
+    # phase totals are per session, a job_queue worker runs many sessions in one process
+    instrumentation.reset()
 
     # running default configuration 
     internal_metrics = default_run(workload_file, args)
@@ -30,85 +44,260 @@ def tune(workload_file, args, use_surrogate=False):
         print("Using REAL EXECUTION for evaluation")
     
     # Run SMAC (this generates your training data)
-    tuner_instance = tuner(args, workload_file, internal_metrics, use_surrogate=use_surrogate)
+    tuner_instance = tuner(args, workload_file, internal_metrics, use_surrogate=use_surrogate, budget=budget)
     best_config = tuner_instance.tune()
 
     print(f"SMAC optimization complete for {workload_file}")
     return best_config
 
+def instance_args(args):
+    """
+    One copy of args per database instance listed in [database_config] instances
+    as host:port[/database][@data_path][#pg_version/cluster], or [args] when none are listed.
+    OLTP default runs restart the cluster and recreate the database, so their
+    instances must not share a server, a data directory or a cluster.
+    """
+    specs = [spec.strip() for spec in args['database_config'].get('instances', '').split(',') if spec.strip()]
+    if not specs:
+        return [args]
+    instances = []
+    for i, spec in enumerate(specs):
+        instance = copy.deepcopy(args)
+        db_config = instance['database_config']
+        spec, _, cluster = spec.partition('#')
+        spec, _, data_path = spec.partition('@')
+        address, _, database = spec.partition('/')
+        host, _, port = address.partition(':')
+        db_config['host'] = host or db_config['host']
+        db_config['port'] = port or db_config['port']
+        if database:
+            db_config['database'] = database
+        if data_path:
+            db_config['data_path'] = data_path
+        if cluster:
+            version, _, name = cluster.rpartition('/')
+            db_config['cluster'] = name
+            if version:
+                db_config['pg_version'] = version
+        # concurrent default runs must not write the same benchmark log
+        root, ext = os.path.splitext(instance['benchmark_config']['log_path'])
+        instance['benchmark_config']['log_path'] = f"{root}_{i}{ext}"
+        instances.append(instance)
+
+    if args['benchmark_config'].get('tool', 'dwg').lower() == 'benchbase':
+        shared = {
+            'server': [(c['host'], str(c['port'])) for c in (a['database_config'] for a in instances)],
+            'data_path': [(c['host'], c['data_path']) for c in (a['database_config'] for a in instances)],
+            'cluster': [(c['host'], c.get('pg_version', '14'), c.get('cluster', 'main'))
+                        for c in (a['database_config'] for a in instances)],
+        }
+        for name, keys in shared.items():
+            if len(set(keys)) < len(keys):
+                raise ValueError(f"OLTP default runs need isolated instances, two instances share a {name}: {keys}")
+    return instances
+
+def surrogate_tune(workload_file, args, internal_metrics):
+    """Surrogate optimization of a workload whose default run is done, runs in a batch_tune worker process"""
+    # pool processes are reused across workloads
+    instrumentation.reset()
+    tuner_instance = tuner(args, workload_file, internal_metrics, use_surrogate=True)
+    return tuner_instance.tune()
+
+def batch_tune(workload_files, args, workers=None):
+    """
+    Surrogate tuning of many workloads in two overlapped stages.
+    Default runs are spread over the database instances, one thread per instance
+    taking the next pending workload. As soon as a workload's internal metrics
+    are in, its surrogate optimization is submitted to a process pool.
+    Returns {workload_file: best config, or the exception it failed with}.
+    """
+    instances = instance_args(args)
+    pending = queue.Queue()
+    for workload_file in workload_files:
+        pending.put(workload_file)
+    # spawn, not fork: the default-run threads may hold locks at submit time
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    futures = {}
+    results = {}
+    lock = threading.Lock()
+
+    def run_defaults(instance):
+        address = f"{instance['database_config']['host']}:{instance['database_config']['port']}"
+        while True:
+            try:
+                workload_file = pending.get_nowait()
+            except queue.Empty:
+                return
+            print(f"Default run of {workload_file} on {address}")
+            try:
+                internal_metrics = default_run(workload_file, instance)
+            except Exception as e:
+                print(f"Default run of {workload_file} failed: {e}")
+                with lock:
+                    results[workload_file] = e
+                continue
+            with lock:
+                futures[workload_file] = pool.submit(surrogate_tune, workload_file, args, internal_metrics)
+
+    threads = [threading.Thread(target=run_defaults, args=(instance,)) for instance in instances]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Default runs complete, waiting for {len(futures)} surrogate optimizations")
+
+    for workload_file, future in futures.items():
+        try:
+            results[workload_file] = future.result()
+            print(f"Surrogate tuning complete for {workload_file}")
+        except Exception as e:
+            print(f"Surrogate tuning of {workload_file} failed: {e}")
+            results[workload_file] = e
+    pool.shutdown()
+    return results
+
 def default_run(workload_file, args):
     """Run the default configuration to generate initial training data."""
 
     print(f"Running default configuration for workload")
-    # create a database instance
-    db = Database(config=args, path=args['tuning_config']['knob_config'])
     # create an instance of workload_executor
     executor = workload_executor(args, utils.get_logger(args['tuning_config']['log_path']), "training_records.log", internal_metrics=None)
+    # share the executor's database, which is the in-process fake with backend = mock
+    db = executor.db
 
     # remove auto_conf from the database
     db.remove_auto_conf()
 
+    # reuse the baseline of an earlier session if workload, database and data are unchanged
+    baseline_cache = BaselineCache(db, args)
+    baseline = baseline_cache.load(workload_file)
+    if baseline is not None and (not executor.prewarm or os.path.exists(output_path(args, hot_relations_path(workload_file)))):
+        return baseline['internal_metrics']
+
     # reset inner metrics
     print("Resetting inner metrics...")
     db.reset_inner_metrics()
 
     # run the workload with default configuration
-    executor.run_config(config=None, workload_file=workload_file)
+    value = executor.run_config(config=None, workload_file=workload_file)
     print(f"Default configuration run complete for workload")
 
     # get the internal metrics
     internal_metrics = db.fetch_inner_metrics()
     print(f"Internal metrics collected: {internal_metrics}")
     
-    # Get benchmark name from config
-    benchmark_name = args['benchmark_config']['benchmark']
-    
     # save the internal metrics to a file
-    if benchmark_name in ['tpcc', 'ycsb', 'smallbank', 'wikipedia', 'twitter']:
-        # For TPCC: use benchmark subdirectory and full XML filename
-        workload_name = os.path.splitext(os.path.basename(workload_file))[0]  # e.g., "sample_tpcc_config0"
-        metrics_dir = f"internal_metrics/{benchmark_name}"
-        os.makedirs(metrics_dir, exist_ok=True)
-        metrics_file = f"{metrics_dir}/{workload_name}_internal_metrics.json"
-    elif benchmark_name == 'tpch':
-        # For other benchmarks: use old structure
-        metrics_file = f"internal_metrics/{workload_file.split('.wg')[0]}_internal_metrics.json"
-    
+    metrics_file = baseline_cache.metrics_file(workload_file)
+    os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
     with open(metrics_file, "w") as f:
         json.dump(internal_metrics, f, indent=4)
     print(f"Internal metrics saved to: {metrics_file}")
+    # QPS and signature of this baseline, so later sessions can skip the default run
+    baseline_cache.save(workload_file, executor.qps, value)
+
+    if executor.stats_rates:
+        # rate features sampled during the default run, next to the cumulative metrics
+        rates_file = metrics_file.replace('_internal_metrics.json', '_stats_rates.json')
+        with open(rates_file, "w") as f:
+            json.dump(executor.stats_rates, f, indent=4)
+        print(f"Stats rates saved to: {rates_file}")
+
+    if executor.prewarm:
+        # relations the default run touched most, prewarmed before every tuning run
+        relations = db.fetch_hot_relations(int(args['benchmark_config'].get('prewarm_relations', 50)))
+        relations_file = output_path(args, hot_relations_path(workload_file))
+        os.makedirs(os.path.dirname(relations_file), exist_ok=True)
+        with open(relations_file, "w") as f:
+            json.dump(relations, f, indent=4)
+        print(f"Hot relations saved to: {relations_file}")
     
     return internal_metrics
 
 class tuner:
-    def __init__(self, args, workload_file, internal_metrics, use_surrogate=False):
+    def __init__(self, args, workload_file, internal_metrics, use_surrogate=False, budget=None):
         self.args = args  # Store args for later use
         self.workload_file = workload_file
         self.knobs_detail = parse_knob_config.get_knobs(args['tuning_config']['knob_config'])
         self.logger = utils.get_logger(args['tuning_config']['log_path'])
         self.internal_metrics = internal_metrics
         self.use_surrogate = use_surrogate
+        self.budget = budget
         self.last_point = []
         ## FIXME: this function call needs to be fixed
         self.stt = workload_executor(args, self.logger, "training_records.log", self.internal_metrics)
+        # runhistories and models go under mock_output_root with backend = mock
+        self.output_root = output_path(args, '.')
 
     def tune(self):
-        self.SMAC(self.workload_file)
+        search = self.args.get('surrogate_config', {}).get('search', 'smac').lower()
+        if self.use_surrogate and search == 'evolutionary':
+            return self.surrogate_search(self.workload_file)
+        return self.SMAC(self.workload_file)
+
+    def save_workload(self, workload_file):
+        # Handle both TPCC (.xml) and OLAP (.wg) files
+        if '.xml' in workload_file:
+            # TPCC: use just the filename without extension
+            return os.path.splitext(os.path.basename(workload_file))[0]  # sample_tpcc_config0
+        # OLAP: use existing logic
+        return workload_file.split('.wg')[0]
+
+    def surrogate_search(self, workload_file):
+        """Batched evolutionary search on the surrogate, written as a SMAC runhistory for gather_training_data"""
+        if self.internal_metrics is None:
+            raise ValueError("Internal metrics not available. Run default_run first to collect them.")
+        sur_config = self.args['surrogate_config']
+        benchmark_name = self.args['benchmark_config']['benchmark']
+        save_workload = self.save_workload(workload_file)
+        print(f"Save workload identifier: {save_workload}")
+        with instrumentation.span('surrogate.search'):
+            best, predicted = run_surrogate_search(
+                self.stt, self.knobs_detail, os.path.join(self.output_root, benchmark_name, f"{save_workload}_smac_output"),
+                evaluations=self.budget or int(sur_config.get('search_evaluations', 20000)),
+                population=int(sur_config.get('search_population', 500)),
+                keep=int(sur_config.get('search_keep', 1000)))
+        print(f"Best predicted QPS: {predicted}")
+        print(best)
+        return best
+
+    def transfer_configurations(self, cs, save_workload):
+        """Initial design warm-started from earlier sessions of similar workloads, None for SMAC's own"""
+        tuning_config = self.args['tuning_config']
+        if tuning_config.get('transfer', 'false').lower() != 'true' or self.internal_metrics is None:
+            return None
+        configs, ranked = transfer_design(self.args['benchmark_config']['benchmark'], self.knobs_detail, save_workload,
+                                          self.internal_metrics, n=int(tuning_config.get('transfer_configs', 10)),
+                                          max_tasks=int(tuning_config.get('transfer_tasks', 0)), root=self.output_root)
+        if not configs:
+            print("No earlier sessions to transfer from, using SMAC's initial design")
+            return None
+        print(f"Warm start from {len(ranked)} earlier sessions, most similar: {ranked[:3]}")
+        return [cs.get_default_configuration()] + [Configuration(cs, values=config) for config in configs]
 
     def SMAC(self, workload_file):
 
+        last_return = [None]
+
         def objective_function(config):
             """SMAC objective function - returns negative performance (SMAC minimizes)"""
+            if last_return[0] is not None:
+                # time SMAC spent choosing this configuration since the previous evaluation
+                instrumentation.record('smac.suggest', time.perf_counter() - last_return[0])
             config_dict = dict(config)  # Convert Configuration to dict first
             print(f"Evaluating configuration: {config_dict}")
             
             if self.use_surrogate:
                 # Use surrogate model for fast prediction
-                performance = self.stt.run_config_surrogate(config_dict, workload_file)
+                with instrumentation.span('surrogate.predict'):
+                    performance = self.stt.run_config_surrogate(config_dict, workload_file)
             else:
                 # Use real execution
                 performance = self.stt.run_config(config_dict, workload_file)
             
+            last_return[0] = time.perf_counter()
+            if self.stt.minimize_latency() and not self.use_surrogate:
+                print(f"Performance ({self.stt.objective} latency): {performance}")
+                return performance
             if performance > 0:
                 performance = -performance
             print(f"Performance (QPS): {performance}")
@@ -134,13 +323,7 @@ class tuner:
         
         print(f"Workload file: {self.workload_file}")
         
-        # Handle both TPCC (.xml) and OLAP (.wg) files
-        if '.xml' in self.workload_file:
-            # TPCC: use just the filename without extension
-            save_workload = os.path.splitext(os.path.basename(self.workload_file))[0]  # sample_tpcc_config0
-        else:
-            # OLAP: use existing logic
-            save_workload = self.workload_file.split('.wg')[0]
+        save_workload = self.save_workload(self.workload_file)
 
         print(f"Save workload identifier: {save_workload}")
 
@@ -150,22 +333,26 @@ class tuner:
         benchmark_name = self.args['benchmark_config']['benchmark']
         
         # Create directories if they don't exist
-        os.makedirs(f"./{benchmark_name}", exist_ok=True)
-        os.makedirs(f"./models/{benchmark_name}", exist_ok=True)
-        os.makedirs("smac_his", exist_ok=True)
+        os.makedirs(os.path.join(self.output_root, benchmark_name), exist_ok=True)
+        os.makedirs(os.path.join(self.output_root, "models", benchmark_name), exist_ok=True)
+        os.makedirs(os.path.join(self.output_root, "smac_his"), exist_ok=True)
         
         scenario = Scenario({"run_obj": "quality",   # {runtime,quality}
-                        "runcount-limit": 100,   # max. number of function evaluations; for this example set to a low number
+                        "runcount-limit": self.budget or 100,   # max. number of function evaluations; for this example set to a low number
                         "cs": cs,               # configuration space
                         "deterministic": "true",
-                        "output_dir": f"./{benchmark_name}/{save_workload}_smac_output",  
+                        "output_dir": os.path.join(self.output_root, benchmark_name, f"{save_workload}_smac_output"),
                         "save_model": "true",
-                        "local_results_path": f"./models/{benchmark_name}/{save_workload}"
+                        "local_results_path": os.path.join(self.output_root, "models", benchmark_name, save_workload)
                         })
         
-        smac = SMAC4HPO(scenario=scenario, rng=np.random.RandomState(42),tae_runner=objective_function, runhistory=runhistory)
+        initial_configurations = self.transfer_configurations(cs, save_workload)
+        smac = SMAC4HPO(scenario=scenario, rng=np.random.RandomState(42),tae_runner=objective_function, runhistory=runhistory,
+                        initial_configurations=initial_configurations)
         incumbent = smac.optimize()  
         print('finish')
+        print("Phase timings:")
+        print(instrumentation.summary_table())
         print(type(incumbent))
         print(incumbent)
         # print(objective_function(incumbent))
@@ -185,5 +372,6 @@ class tuner:
                 }
             return json.dumps(data_to_save, indent=4)
 
-        with open(f"smac_his/{save_workload}_smac.json", "w") as f:
+        with open(os.path.join(self.output_root, "smac_his", f"{save_workload}_smac.json"), "w") as f:
             f.write(runhistory_to_json(runhistory))
+        return incumbent.get_dictionary() if incumbent is not None else None
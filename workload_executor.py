@@ -1,21 +1,97 @@
 import copy
+import hashlib
 import time
 import os
+import uuid
 from multi_thread import multi_thread
+from async_multi_session import async_multi_session
 from benchbase_runner import BenchBaseRunner
-import Database
+from benchbase_config import database_overrides
+from result_cache import ResultCache
+from sample_sink import shared_sink
+from stats_sampler import StatsSampler
+from host_telemetry import HostSampler
+import instrumentation
+from instrumentation import evaluation, span
+from mock_backend import MockBenchmark, create_database, output_path
 import json
 import joblib
 
+def stats_file_name(config, workload_file):
+    """
+    Unique npz name per evaluation: workload, a hash of the configuration
+    (or "default") and a random suffix, so parallel runs never collide
+    """
+    workload_name = os.path.splitext(os.path.basename(workload_file))[0]
+    if config is None:
+        config_id = 'default'
+    else:
+        config_id = hashlib.sha1(json.dumps(dict(config), sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return f"{workload_name}_{config_id}_{int(time.time())}_{uuid.uuid4().hex[:8]}.npz"
+
+def hot_relations_path(workload_file):
+    """Where default_run stores the relations to prewarm for a workload"""
+    workload_name = os.path.splitext(os.path.basename(workload_file))[0]
+    return os.path.join('internal_metrics', 'prewarm', f'{workload_name}.json')
+
+
+latency_objectives = ['mean', 'p50', 'p95', 'p99']
+
+
 class workload_executor:
     def __init__(self, args, logger, records_log, internal_metrics):
         self.args = args
         self.benchmark_config = args['benchmark_config']
         self.sur_config = args['surrogate_config']
         self.logger = logger
-        self.db = Database.Database(config=args, path=args['tuning_config']['knob_config'])
+        # backend = mock swaps PostgreSQL and the benchmark for in-process fakes, see mock_backend.py
+        self.db = create_database(args, args['tuning_config']['knob_config'])
+        self.mock_benchmark = None
+        if self.benchmark_config.get('backend', 'postgres').lower() == 'mock':
+            self.mock_benchmark = MockBenchmark(self.db, self.benchmark_config)
         self.records_log = records_log
         self.internal_metrics = internal_metrics
+        # qps (maximize throughput) or a latency statistic to minimize: mean, p50, p95, p99
+        self.objective = self.benchmark_config.get('objective', 'qps').lower()
+        if self.objective != 'qps' and self.objective not in latency_objectives:
+            raise ValueError(f"Unknown objective '{self.objective}', expected qps or one of {latency_objectives}")
+        # latency cost in seconds of a failed run, or one that completed no statement
+        self.latency_penalty = float(self.benchmark_config.get('latency_penalty', 3600))
+        self.latency = None
+        self.txn_throughput = None
+        self.stability = None
+        # use the warm-up trimmed BenchBase throughput instead of the whole-run average
+        self.steady_state = self.benchmark_config.get('steady_state', 'false').lower() == 'true'
+        # extra BenchBase runs allowed while the measurement is flagged noisy
+        self.rerun_if_noisy = int(self.benchmark_config.get('rerun_if_noisy', 0))
+        # load the default run's hot relations into shared_buffers before each measured run
+        self.prewarm = self.benchmark_config.get('prewarm', 'false').lower() == 'true'
+        self.prewarm_threads = int(self.benchmark_config.get('prewarm_threads', 4))
+        self.prewarm_time = None
+        # poll PostgreSQL stats every stats_interval ms while the workload runs, 0 disables
+        self.stats_interval = int(self.benchmark_config.get('stats_interval', 0))
+        self.stats_dir = output_path(args, self.benchmark_config.get('stats_dir', 'smac_his/stats'))
+        self.stats_rates = None
+        self.stats_path = None
+        # sample host CPU/memory/disk/network and postgres/java usage every host_interval ms, 0 disables
+        self.host_interval = int(self.benchmark_config.get('host_interval', 0))
+        self.host_metrics = None
+        # per-evaluation phase durations, see instrumentation.py
+        instrumentation.configure(output_path(args, self.benchmark_config.get('timing_log', 'smac_his/phase_timings.jsonl')))
+        # reuse results of configurations already measured on the same workload and database
+        self.result_cache = None
+        if self.benchmark_config.get('result_cache', 'false').lower() == 'true':
+            self.result_cache = ResultCache(output_path(args, self.benchmark_config.get('result_cache_path', 'smac_his/result_cache.db')),
+                                            float(self.benchmark_config.get('result_cache_ttl', 0)))
+        # measure again and overwrite cached entries instead of reading them
+        self.result_cache_refresh = self.benchmark_config.get('result_cache_refresh', 'false').lower() == 'true'
+        self.qps = None
+        # single writer for smac_his/offline_sample.jsonl, shared by every executor of this process
+        # and safe with concurrent sessions; the mock backend writes its own file under mock_output_root
+        self.sample_sink = shared_sink(output_path(args, self.benchmark_config.get('sample_path', 'smac_his/offline_sample.jsonl')),
+                                       self.benchmark_config.get('sample_backend', 'jsonl'),
+                                       int(self.benchmark_config.get('sample_batch', 1)),
+                                       float(self.benchmark_config.get('sample_flush_interval', 5)))
         
         # Load knob config for normalization
         self.knob_config_path = args['tuning_config']['knob_config']
@@ -43,7 +119,44 @@ class workload_executor:
         Test a single configuration on OLAP workload
         Returns: performance score (QPS)
         """
+        # the default run is never cached, it also produces the internal metrics
+        cache_key = None
+        if config is not None and self.result_cache is not None:
+            cache_key = self.result_cache.make_key(workload_file, self.database_key(), self.benchmark_config, config, self.knobs)
+            cached = None if self.result_cache_refresh else self.result_cache.get(cache_key[0])
+            if cached is not None:
+                print(f"Cached result ({cached['age']:.0f}s old), skipping evaluation. QPS: {cached['qps']}")
+                self.qps = cached['qps']
+                self.latency = cached['latency']
+                if self.minimize_latency():
+                    return self.latency_cost()
+                return self.qps
+
+        with evaluation('default' if config is None else 'config'):
+            result = self.evaluate(config, workload_file)
+
+        if cache_key is not None and self.qps:
+            key, workload_hash, vector = cache_key
+            self.result_cache.put(key, workload_file, workload_hash, self.database_key(), vector, self.qps, self.latency)
+        return result
+
+    def database_key(self):
+        """Database identity for the result cache: server, database name and BenchBase scale factor"""
+        database_config = self.args['database_config']
+        database = database_config['database']
+        scale = database_overrides.get(database, {}).get('scalefactor', '')
+        return f"{database_config['host']}:{database_config['port']}/{database}@{scale}"
+
+    def evaluate(self, config, workload_file):
         print("Workload executor is called")
+        self.latency = None
+        self.txn_throughput = None
+        self.stability = None
+        self.prewarm_time = None
+        self.stats_rates = None
+        self.stats_path = None
+        self.host_metrics = None
+        self.qps = None
         
         # Step 0: For OLTP workloads, recreate database from template first
         tool = self.benchmark_config.get('tool', 'dwg').lower()
@@ -58,51 +171,160 @@ class workload_executor:
         if config is not None:
             print(f"Appling configuration")
             self.db.change_knob(temp_config)
+
+        if self.prewarm:
+            self.prewarm_buffers(workload_file)
         
         # Step 2: Run workload based on tool configuration
         log_file = self.benchmark_config['log_path']
+        sampler = StatsSampler(self.db, self.stats_interval).start() if self.stats_interval > 0 else None
+        host_sampler = HostSampler(self.host_interval).start() if self.host_interval > 0 else None
         
-        if tool == 'benchbase':
-            print(f"Step 2: Run OLTP workload using BenchBase")
-            workload_path = workload_file
-            print(f"Workload path: {workload_path}")
-            performance = self.test_by_benchbase(workload_path, log_file)
-            qps = performance  # BenchBase returns throughput directly
-        else:
-            print(f"Step 2: Run OLAP workload using DWG")
-            workload_path = workload_file
-            print(f"Workload path: {workload_path}")
-            performance = self.test_by_dwg(workload_path, log_file)
-            # test_by_dwg returns [negative_avg_time, qps]
-            qps = performance[1]  # Use QPS as our performance metric 
+        try:
+            if self.mock_benchmark is not None:
+                print(f"Step 2: Run mock workload")
+                workload_path = workload_file
+                qps, self.latency = self.mock_benchmark.run(workload_path)
+            elif tool == 'benchbase':
+                print(f"Step 2: Run OLTP workload using BenchBase")
+                workload_path = workload_file
+                print(f"Workload path: {workload_path}")
+                performance = self.test_by_benchbase(workload_path, log_file)
+                qps = performance  # BenchBase returns throughput directly
+            else:
+                print(f"Step 2: Run OLAP workload using DWG")
+                workload_path = workload_file
+                print(f"Workload path: {workload_path}")
+                performance = self.test_by_dwg(workload_path, log_file)
+                # test_by_dwg returns [negative_avg_time, qps]
+                qps = performance[1]  # Use QPS as our performance metric 
+        finally:
+            # benchmark failures are routine here, never leave the samplers polling into the next evaluation
+            if sampler is not None:
+                sampler.stop()
+            if host_sampler is not None:
+                host_sampler.stop()
+
+        if sampler is not None:
+            with span('executor.stats_save'):
+                self.stats_rates = sampler.rate_features()
+                self.stats_path = sampler.save(os.path.join(self.stats_dir, stats_file_name(config, workload_file)))
+        if host_sampler is not None:
+            self.host_metrics = host_sampler.summary()
+            print(f"Host utilization: CPU {self.host_metrics.get('cpu_util_mean', 0):.1f}%, "
+                  f"iowait {self.host_metrics.get('cpu_iowait_mean', 0):.1f}%, "
+                  f"disk {self.host_metrics.get('disk_util_max', 0):.1f}% peak")
 
         # negate qps
         if qps > 0:
             qps = -qps
+        self.qps = qps
         if config:
             # Step 4: Save the data
-            with open('smac_his/offline_sample.jsonl', 'a') as f:
-                temp_config['y'] = [qps, 1/(qps)]  # Multiple performance values
-                temp_config['inner_metrics'] = self.internal_metrics  # Database metrics
-                temp_config['workload'] = workload_path  # Full workload path
-                f.write(json.dumps(temp_config) + '\n')
+            sample = dict(temp_config)
+            sample['y'] = [qps, 1/(qps) if qps else 0.0]  # Multiple performance values
+            sample['inner_metrics'] = self.internal_metrics  # Database metrics
+            sample['workload'] = workload_path  # Full workload path
+            if self.latency is not None:
+                sample['latency'] = self.latency['overall']
+            if self.txn_throughput is not None:
+                sample['txn_throughput'] = self.txn_throughput
+            if self.stability is not None:
+                sample['stability'] = self.stability
+            if self.prewarm_time is not None:
+                sample['prewarm_time'] = self.prewarm_time
+            if self.stats_rates:
+                sample['stats_rates'] = self.stats_rates
+            if self.stats_path is not None:
+                sample['stats_path'] = self.stats_path
+            if self.host_metrics:
+                sample['host_metrics'] = self.host_metrics
+            with span('executor.save_sample'):
+                self.sample_sink.write(sample)
 
 
         print(f"Configuration: {config}, QPS: {qps}")
+
+        if self.minimize_latency():
+            cost = self.latency_cost()
+            print(f"Objective {self.objective} latency: {cost}")
+            return cost
         
         return qps 
 
+    def prewarm_buffers(self, workload_file):
+        """Prewarm the hot relations recorded by the default run, timed apart from the workload"""
+        path = output_path(self.args, hot_relations_path(workload_file))
+        if not os.path.exists(path):
+            print(f"No hot relations recorded at {path}, skipping prewarm")
+            return
+        with open(path, 'r') as f:
+            relations = json.load(f)
+        print(f"Step 1.5: Prewarming {len(relations)} hot relations")
+        self.prewarm_time, _ = self.db.prewarm_relations(relations, self.prewarm_threads)
+        print(f"Prewarm time: {self.prewarm_time:.2f} seconds")
+
+    def minimize_latency(self):
+        """True when the SMAC cost is a latency statistic rather than negative QPS"""
+        return self.objective != 'qps'
+
+    def latency_cost(self):
+        """Objective latency of the last run, latency_penalty when it failed or measured no statement"""
+        overall = (self.latency or {}).get('overall') or {}
+        if not self.qps or not overall.get('count'):
+            print(f"Run failed or completed no statement, charging latency penalty {self.latency_penalty}")
+            return self.latency_penalty
+        return overall[self.objective]
+
     
     def test_by_dwg(self, workload_path, log_file):
-        mh = multi_thread(self.db, workload_path, int(self.benchmark_config['thread']), log_file)
+        driver = self.benchmark_config.get('driver', 'thread').lower()
+        options = {
+            'prepared': self.benchmark_config.get('prepared', 'false').lower() == 'true',
+            'statement_timeout': int(self.benchmark_config.get('statement_timeout', 0)),
+            'run_budget': float(self.benchmark_config.get('run_budget', 0)),
+            'timeout_penalty': float(self.benchmark_config.get('timeout_penalty', 2.0)),
+        }
+        if driver == 'async':
+            session_num = int(self.benchmark_config.get('sessions', self.benchmark_config['thread']))
+            mh = async_multi_session(self.db, workload_path, session_num, log_file, **options)
+        else:
+            mh = multi_thread(self.db, workload_path, int(self.benchmark_config['thread']), log_file, **options)
 
         mh.data_pre()
-        return mh.run()
+        performance = mh.run()
+        self.latency = mh.latency.to_dict()
+        return performance
 
     def test_by_benchbase(self, workload_path, log_file):
         # Test the database performance using benchbase
-        benchbase_runner = BenchBaseRunner(self.args, self.logger)
-        return benchbase_runner.run_benchmark(workload_path, log_file)
+        attempts = []
+        for attempt in range(self.rerun_if_noisy + 1):
+            if attempt > 0:
+                print(f"Noisy measurement, re-running BenchBase (attempt {attempt + 1}/{self.rerun_if_noisy + 1})")
+                if not self.db.recreate_from_template():
+                    print("Warning: Failed to recreate database from template, continuing anyway...")
+            benchbase_runner = BenchBaseRunner(self.args, self.logger)
+            throughput = benchbase_runner.run_benchmark(workload_path, log_file)
+            result = benchbase_runner.last_result or {}
+            stability = result.get('stability')
+            if self.steady_state and stability is not None and throughput:
+                throughput = stability['steady_throughput']
+            attempts.append((throughput, result))
+            if not throughput or stability is None or not stability['noisy']:
+                break
+
+        throughput, result = attempts[-1]
+        if len(attempts) > 1 and throughput and result['stability']['noisy']:
+            # every attempt was noisy, keep the median one
+            attempts.sort(key=lambda a: a[0])
+            throughput, result = attempts[len(attempts) // 2]
+        if 'latency' in result:
+            # per-transaction-type percentiles, so latency objectives also work for OLTP
+            self.latency = result['latency']
+            self.txn_throughput = result['txn_throughput']
+        self.stability = result.get('stability')
+        return throughput
 
     def run_config_surrogate(self, config, workload_file):
         """
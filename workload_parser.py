@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import threading
+
+# Characters that can change the lexical state outside of quotes and comments
+special_pattern = re.compile(r"[;'\"$]|--|/\*")
+block_comment_pattern = re.compile(r"/\*|\*/")
+dollar_tag_pattern = re.compile(r"\$([A-Za-z_][A-Za-z_0-9]*)?\$")
+
+_lock = threading.Lock()
+_statements_by_digest = {}
+_digest_by_file = {}
+
+
+def iter_statements(lines):
+    """
+    Yield SQL statements one at a time from an iterable of text lines.
+    Statements end at ';' outside of quoted strings, quoted identifiers,
+    dollar-quoted bodies and comments. Comments are dropped and the trailing
+    ';' is not included.
+    """
+    buf = []
+    state = None        # None, "'", '"', '$', '/*'
+    dollar_tag = None
+    depth = 0
+
+    for line in lines:
+        pos = 0
+        n = len(line)
+        while pos < n:
+            if state is None:
+                m = special_pattern.search(line, pos)
+                if m is None:
+                    buf.append(line[pos:])
+                    break
+                buf.append(line[pos:m.start()])
+                token = m.group()
+                pos = m.end()
+                if token == ';':
+                    statement = ''.join(buf).strip()
+                    buf = []
+                    if statement:
+                        yield statement
+                elif token == '--':
+                    # rest of the line is a comment, keep the newline as a separator
+                    buf.append('\n')
+                    break
+                elif token == '/*':
+                    state, depth = '/*', 1
+                    buf.append(' ')
+                elif token == '$':
+                    tag = dollar_tag_pattern.match(line, m.start())
+                    if tag is None:
+                        buf.append('$')
+                    else:
+                        buf.append(tag.group())
+                        state, dollar_tag = '$', tag.group()
+                        pos = tag.end()
+                else:
+                    buf.append(token)
+                    state = token
+            elif state == '/*':
+                m = block_comment_pattern.search(line, pos)
+                if m is None:
+                    break
+                pos = m.end()
+                depth += 1 if m.group() == '/*' else -1
+                if depth == 0:
+                    state = None
+            elif state == '$':
+                end = line.find(dollar_tag, pos)
+                if end < 0:
+                    buf.append(line[pos:])
+                    break
+                buf.append(line[pos:end + len(dollar_tag)])
+                pos = end + len(dollar_tag)
+                state = None
+            else:
+                # inside '...' or "...", a doubled quote is an escaped quote
+                end = line.find(state, pos)
+                if end < 0:
+                    buf.append(line[pos:])
+                    break
+                if end + 1 < n and line[end + 1] == state:
+                    buf.append(line[pos:end + 2])
+                    pos = end + 2
+                    continue
+                buf.append(line[pos:end + 1])
+                pos = end + 1
+                state = None
+
+    statement = ''.join(buf).strip()
+    if statement and state != '/*':
+        yield statement
+
+
+def file_digest(path):
+    """Content hash of a workload file, re-read only when its size or mtime changes"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        cached = _digest_by_file.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _lock:
+        _digest_by_file[path] = (stamp, digest)
+    return digest
+
+
+def load_workload(path):
+    """
+    Parsed statements of a workload file as a tuple.
+    Results are cached per content hash and shared by the OLAP drivers,
+    the query plan extractor and the workload feature extractor.
+    """
+    digest = file_digest(path)
+    with _lock:
+        statements = _statements_by_digest.get(digest)
+    if statements is None:
+        with open(path, 'r') as f:
+            statements = tuple(iter_statements(f))
+        with _lock:
+            _statements_by_digest[digest] = statements
+    return statements